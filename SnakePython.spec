@@ -1,5 +1,12 @@
 # -*- mode: python ; coding: utf-8 -*-
+import argparse
 
+# pyinstaller SnakePython.spec -- --onedir builds dist/SnakePython/ instead
+# of a single exe, which starts faster because nothing is unpacked to a temp
+# folder on each run.
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true")
+options = parser.parse_args()
 
 a = Analysis(
     ['SnakePython.py'],
@@ -10,18 +17,24 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # pygame imports these if present, but the game never uses them.
+    excludes=['numpy', 'pkg_resources'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
+if options.onedir:
+    bundled = []
+else:
+    bundled = [a.binaries, a.datas]
+
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
+    *bundled,
     [],
+    exclude_binaries=options.onedir,
     name='SnakePython',
     debug=False,
     bootloader_ignore_signals=False,
@@ -36,3 +49,14 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if options.onedir:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        name='SnakePython',
+    )
@@ -0,0 +1,140 @@
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from snake_engine import AI_KINDS, DIRECTIONS, GameState
+
+# AI moves decided off the render loop. As soon as a tick resolves and the
+# next one is an AI tick, a snapshot of the board goes to a worker thread (or
+# process pool), which runs the same decide_ai() the engine would. The AI
+# tick then takes the result, waiting at most the deadline; a worker that is
+# still busy by then is replaced by GameState.fallback_directions().
+#
+# A snapshot decides exactly what the synchronous step() would, RNG draws
+# and planner paths included, as long as nothing else draws from state.rng
+# between two ticks (a human player never does). Fallback ticks are recorded
+# in state.fallback_ticks so replays repeat them.
+
+AI_DEADLINE = 0.005  # Seconds an AI tick waits for a late worker.
+
+
+class AIWorker:
+    def __init__(self, executor=None, deadline=AI_DEADLINE):
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.deadline = deadline
+        self.future = None
+        self.state = None  # State and tick the pending decision is for.
+        self.tick = None
+        self.late = 0  # AI ticks that fell back.
+
+    def prepare(self, state):
+        # Starts deciding the next AI tick, if that is the next tick.
+        if state.game_over or not state.is_ai_tick() or not state.ai_snakes:
+            return
+        if self.future is not None and (self.state, self.tick) == (state, state.tick):
+            return
+        self.cancel()
+        self.state = state
+        self.tick = state.tick
+        self.future = self.executor.submit(state.snapshot().decide_ai)
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+    def step(self, state, player_direction=None, recorder=None):
+        # state.step() (or recorder.step()) with the AI moves decided ahead.
+        # Returns True once the game is over.
+        step = recorder.step if recorder else state.step
+        if state.game_over or not state.is_ai_tick() or not state.ai_snakes:
+            game_over = step(player_direction)
+        else:
+            self.prepare(state)
+            future = self.future
+            self.future = None
+            start = time.perf_counter()
+            try:
+                decision = future.result(self.deadline)
+            except TimeoutError:
+                future.cancel()
+                self.late += 1
+                game_over = step(player_direction, ai_fallback=True)
+            else:
+                game_over = step(player_direction, ai_decision=decision)
+            if state.profiler:
+                state.profiler.add("ai wait", time.perf_counter() - start)
+        self.prepare(state)
+        return game_over
+
+    def close(self):
+        self.cancel()
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+
+
+# --- Check ---
+
+
+def play_inputs(state, seed, worker=None, recorder=None, turn_chance=0.2):
+    # Plays state to the end with random key presses applied the way the game
+    # loop does: to the state, between ticks. Returns the state of each tick.
+    from snake_replay import encode_state
+
+    keys = random.Random(seed)
+    states = []
+    while not state.game_over:
+        if keys.random() < turn_chance:
+            state.set_player_direction(keys.choice(DIRECTIONS))
+        if worker:
+            worker.step(state, recorder=recorder)
+        elif recorder:
+            recorder.step()
+        else:
+            state.step()
+        states.append(encode_state(state))
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that AI moves decided on the worker match the "
+        "synchronous engine."
+    )
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--ai-kind", choices=list(AI_KINDS), action="append")
+    # A small board keeps the player close enough to the AIs to matter.
+    parser.add_argument("--width", type=int, default=20)
+    parser.add_argument("--height", type=int, default=15)
+    parser.add_argument("--ai", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failed = 0
+    worker = AIWorker(deadline=None)  # Never falls back, so the moves must match.
+    for ai_kind in args.ai_kind or list(AI_KINDS):
+        for seed in range(args.seed, args.seed + args.games):
+            config = (args.width, args.height, args.ai, 25)
+            expected = play_inputs(GameState(*config, seed=seed, ai_kind=ai_kind), seed)
+            state = GameState(*config, seed=seed, ai_kind=ai_kind)
+            actual = play_inputs(state, seed, worker)
+            if actual != expected:
+                # One of the games may have ended before the other.
+                tick = 0
+                while (
+                    tick < min(len(actual), len(expected))
+                    and actual[tick] == expected[tick]
+                ):
+                    tick += 1
+                print(f"{ai_kind} seed {seed}: worker diverged at tick {tick + 1}")
+                failed += 1
+        print(f"{ai_kind}: {args.games} games checked")
+    worker.close()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+import argparse
+import time
+
+import numpy as np
+
+from snake_engine import (
+    AI_MOVE_DELAY,
+    DIFFICULTY_PRESETS,
+    DIRECTIONS,
+    GOLD_FOOD_VALUE,
+    GOLD_GROWTH,
+    NORMAL_FOOD_VALUE,
+    NORMAL_GROWTH,
+    PROB_RED,
+    PROB_YELLOW,
+    YELLOW_FOOD_VALUE,
+    ai_start_positions,
+    arena_food_count,
+)
+
+# Many independent games advanced together with NumPy, for tuning runs that
+# need far more games than the scalar engine can play. Snake 0 of every game
+# is the player (autopiloted), snakes 1.. are the AIs.
+#
+# Each cell stores the snake that last entered it and the move number it did
+# so on. A segment is alive while that move number is within the snake's
+# length of its latest move, so tails drop off without storing bodies. The
+# rules follow GameState.step(); the differences are:
+#   - the AI's trap check is a flood fill bounded to the TRAP_RADIUS square
+#     around each move, which counts at most TRAP_AREA cells rather than
+#     the whole region, and the AI targets the nearest food by toroidal
+#     distance;
+#   - a cell holds one segment, so when the rules let two snakes share a cell
+#     (two AIs stepping onto the same cell, say) the newer segment replaces
+#     the older one;
+#   - a snake left without a safe move on two AI ticks in a row loses, which
+#     is what its duplicated head leads to in the scalar rules.
+
+# Winner codes; codes from AI_SCORE_WIN up mean AI snake (code - AI_SCORE_WIN)
+# reached the win score.
+RUNNING = 0
+PLAYER_WINS = 1
+AI_WINS = 2
+TIE = 3
+AI_SCORE_WIN = 4
+
+UNREACHED = 1 << 30
+TRAP_RADIUS = 6  # Cells the trap check's flood fill may go from the move.
+# Free cells a move must reach within that square, if the snake needs more.
+TRAP_AREA = (2 * TRAP_RADIUS + 1) ** 2 // 2
+
+
+def winner_name(code):
+    # Same strings as GameState.winner.
+    if code == PLAYER_WINS:
+        return "Player"
+    elif code == AI_WINS:
+        return "AI"
+    elif code == TIE:
+        return "It is a Tie"
+    elif code >= AI_SCORE_WIN:
+        return f"AI Snake {code - AI_SCORE_WIN + 1}"
+    return None
+
+
+class BatchGame:
+    def __init__(
+        self,
+        n_games,
+        grid_width,
+        grid_height,
+        num_ai=1,
+        win_score=15,
+        seed=None,
+        food_count=None,
+        ai_move_delay=AI_MOVE_DELAY,
+        prob_red=PROB_RED,
+        prob_yellow=PROB_YELLOW,
+        normal_growth=NORMAL_GROWTH,
+        gold_growth=GOLD_GROWTH,
+    ):
+        if food_count is None:
+            food_count = arena_food_count(num_ai)
+        self.n_games = n_games
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_snakes = num_ai + 1
+        self.win_score = win_score
+        self.ai_move_delay = ai_move_delay
+        self.prob_red = prob_red
+        self.prob_yellow = prob_yellow
+        self.rng = np.random.default_rng(seed)
+
+        # Food types: 0 red, 1 yellow, 2 gold.
+        self.food_score = np.array(
+            [NORMAL_FOOD_VALUE, YELLOW_FOOD_VALUE, GOLD_FOOD_VALUE], dtype=np.int32
+        )
+        self.food_growth = np.array(
+            [normal_growth, normal_growth, gold_growth], dtype=np.int32
+        )
+
+        size = grid_width * grid_height
+        cells = np.arange(size)
+        x = cells % grid_width
+        y = cells // grid_width
+        self.adjacent = np.stack(
+            [
+                y * grid_width + (x + dx) % grid_width
+                if dy == 0
+                else ((y + dy) % grid_height) * grid_width + x
+                for dx, dy in DIRECTIONS
+            ],
+            axis=1,
+        ).astype(np.int32)
+
+        n, s = n_games, self.num_snakes
+        self.rows = np.arange(n)
+        # The trap check reads the square within TRAP_RADIUS of a move: the
+        # offsets of its rows and columns, and the bit of each column in a
+        # row's mask.
+        self.trap_span = np.arange(-TRAP_RADIUS, TRAP_RADIUS + 1, dtype=np.int32)
+        self.column_bits = 1 << np.arange(self.trap_span.size, dtype=np.int32)
+        side = 2 * TRAP_RADIUS + 1
+        self.popcount = np.array(
+            [bin(mask).count("1") for mask in range(1 << side)], dtype=np.int32
+        )
+        # Snake index + 1; int8 holds up to 127 snakes, larger arenas need int16.
+        owner_type = np.int8 if s < 128 else np.int16
+        self.owner = np.zeros((n, size), dtype=owner_type)
+        self.birth = np.zeros((n, size), dtype=np.int32)  # move that placed it
+        self.moves = np.ones((n, s), dtype=np.int32)
+        self.length = np.ones((n, s), dtype=np.int32)
+        self.growth = np.zeros((n, s), dtype=np.int32)
+        self.scores = np.zeros((n, s), dtype=np.int32)
+        self.stuck = np.zeros((n, s), dtype=bool)
+        self.player_direction = np.zeros(n, dtype=np.int8)  # index in DIRECTIONS
+
+        starts = [(3 * grid_width // 4, grid_height // 2)]
+        starts += ai_start_positions(num_ai, grid_width, grid_height)
+        self.heads = np.empty((n, s), dtype=np.int32)
+        for idx, (sx, sy) in enumerate(starts):
+            cell = sy * grid_width + sx
+            self.heads[:, idx] = cell
+            self.owner[:, cell] = idx + 1
+            self.birth[:, cell] = 1
+
+        self.food_pos = np.full((n, food_count), -1, dtype=np.int32)
+        self.food_kind = np.zeros((n, food_count), dtype=np.int8)
+        for slot in range(food_count):
+            self._spawn_food(self.rows, np.full(n, slot))
+
+        self.ai_move_counter = 0
+        self.tick = 0
+        self.active = np.ones(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int16)
+        self.ticks = np.zeros(n, dtype=np.int32)
+
+    # --- Board Queries ---
+
+    def _occupant(self, rows, cells):
+        # Snake index alive on each cell (-1 if free) and the cell's birth.
+        # rows must broadcast against cells.
+        return self._occupant_at(rows, rows * self.owner.shape[1] + cells)
+
+    def _occupant_at(self, rows, index):
+        # Same, for cells given as flat indices into owner. NumPy gathers
+        # through flat indices much faster than with a pair of arrays.
+        snake = self.owner.reshape(-1).take(index).astype(np.int32) - 1
+        birth = self.birth.reshape(-1).take(index)
+        oldest = self.moves - self.length
+        last = oldest.reshape(-1).take(rows * self.num_snakes + np.maximum(snake, 0))
+        alive = (snake >= 0) & (birth > last)
+        return np.where(alive, snake, -1), birth
+
+    def _free_cells(self, row):
+        snake = self.owner[row].astype(np.int32) - 1
+        oldest = self.moves[row] - self.length[row]
+        free = (snake < 0) | (self.birth[row] <= oldest[np.maximum(snake, 0)])
+        food = self.food_pos[row]
+        free[food[food >= 0]] = False
+        return np.flatnonzero(free)
+
+    # --- Food ---
+
+    def _spawn_food(self, rows, slots):
+        # Puts a new food into food slot slots[i] of game rows[i]. Sampling is
+        # by rejection; games still without a cell after that fall back to an
+        # exact pick, and full boards leave the slot empty (-1) to be refilled
+        # on a later tick.
+        if rows.size == 0:
+            return
+        size = self.grid_width * self.grid_height
+        cells = np.full(rows.size, -1, dtype=np.int32)
+        pending = np.arange(rows.size)
+        for _ in range(32):
+            if pending.size == 0:
+                break
+            guess = self.rng.integers(0, size, size=pending.size, dtype=np.int32)
+            game = rows[pending]
+            occupant, _ = self._occupant(game, guess)
+            on_food = (self.food_pos[game] == guess[:, None]).any(axis=1)
+            ok = (occupant < 0) & ~on_food
+            # Two slots of one game refilled together must not share a cell.
+            _, first = np.unique(game * size + guess, return_index=True)
+            ok[np.setdiff1d(np.arange(pending.size), first)] = False
+            cells[pending[ok]] = guess[ok]
+            self.food_pos[game[ok], slots[pending[ok]]] = guess[ok]
+            pending = pending[~ok]
+        for i in pending:
+            free = self._free_cells(rows[i])
+            if free.size:
+                cells[i] = self.rng.choice(free)
+                self.food_pos[rows[i], slots[i]] = cells[i]
+        p = self.rng.random(rows.size)
+        kind = np.where(
+            p < self.prob_red, 0, np.where(p < self.prob_red + self.prob_yellow, 1, 2)
+        )
+        self.food_pos[rows, slots] = cells
+        self.food_kind[rows, slots] = kind
+
+    def _eat(self, rows, snake, heads):
+        # Applies eating or growth for snake after it moved to heads in rows.
+        eaten = self.food_pos[rows] == heads[:, None]
+        ate = eaten.any(axis=1)
+        slot = eaten.argmax(axis=1)
+        eat_rows = rows[ate]
+        if eat_rows.size:
+            kind = self.food_kind[eat_rows, slot[ate]]
+            self.scores[eat_rows, snake] += self.food_score[kind]
+            self.growth[eat_rows, snake] += self.food_growth[kind]
+            self.length[eat_rows, snake] += 1
+            self.food_pos[eat_rows, slot[ate]] = -1
+            self._spawn_food(eat_rows, slot[ate])
+        grow_rows = rows[~ate]
+        grow_rows = grow_rows[self.growth[grow_rows, snake] > 0]
+        self.growth[grow_rows, snake] -= 1
+        self.length[grow_rows, snake] += 1
+
+    # --- AI ---
+
+    def _choose_moves(self, ai_moved):
+        # Index in DIRECTIONS of each snake's move, and whether it has any
+        # safe move at all. AI snakes only choose on AI ticks.
+        width, height = self.grid_width, self.grid_height
+        rows = self.rows[:, None, None]
+        heads = self.heads
+        candidates = self.adjacent[heads]  # (games, snakes, 4)
+        occupant, birth = self._occupant(rows, candidates)
+        snake_ids = np.arange(self.num_snakes)[None, :, None]
+        tail_birth = (self.moves - self.length + 1)[:, :, None]
+        own_tail = (
+            (occupant == snake_ids)
+            & (birth == tail_birth)
+            & (self.growth[:, :, None] == 0)
+        )
+        safe = (occupant < 0) | own_tail
+
+        # Target the nearest food by toroidal distance from the head.
+        food = self.food_pos[:, None, :]
+        dx = np.abs((heads % width)[:, :, None] - food % width)
+        dx = np.minimum(dx, width - dx)
+        dy = np.abs((heads // width)[:, :, None] - food // width)
+        dy = np.minimum(dy, height - dy)
+        dist = np.where(food >= 0, dx + dy, UNREACHED)
+        target = np.take_along_axis(
+            self.food_pos[:, None, :].repeat(self.num_snakes, axis=1),
+            dist.argmin(axis=2)[:, :, None],
+            axis=2,
+        )
+        dx = np.abs(candidates % width - target % width)
+        dx = np.minimum(dx, width - dx)
+        dy = np.abs(candidates // width - target // width)
+        dy = np.minimum(dy, height - dy)
+        dist = dx + dy
+        safe &= ~self._trapped(candidates, safe, dist, ai_moved)
+        dist = np.where(safe, dist, UNREACHED)
+        return dist.argmin(axis=2), safe.any(axis=2)
+
+    def _trapped(self, candidates, safe, dist, ai_moved):
+        # Safe moves into a pocket too small for the snake. Only the moves a
+        # snake may take are checked: the one nearest the target first, and
+        # the others only when that one is trapped. A lone safe move is taken
+        # anyway, and when every move is trapped the roomiest is the best
+        # guess, since the bounded fill may not see the way out.
+        trapped = np.zeros(safe.shape, dtype=bool)
+        choosing = (safe.sum(axis=2) > 1) & self.active[:, None]
+        if not ai_moved:
+            choosing[:, 1:] = False
+        game, snake = np.nonzero(choosing)
+        if game.size == 0:
+            return trapped
+        needed = self._needed_area()[game, snake]
+        safe = safe[game, snake]
+        nearest = np.where(safe, dist[game, snake], UNREACHED).argmin(axis=1)
+        area = np.full(safe.shape, -1, dtype=np.int32)
+        pair = np.arange(game.size)
+        area[pair, nearest] = self._open_area(
+            game, snake, candidates[game, snake, nearest], needed
+        )
+        pair = np.nonzero(area[pair, nearest] < needed)[0]
+        if pair.size == 0:
+            return trapped
+
+        others = safe[pair]
+        others[np.arange(pair.size), nearest[pair]] = False
+        row, move = np.nonzero(others)
+        pair = pair[row]
+        area[pair, move] = self._open_area(
+            game[pair],
+            snake[pair],
+            candidates[game[pair], snake[pair], move],
+            needed[pair],
+        )
+        stuck = np.unique(pair)
+        area = area[stuck]
+        roomiest = area == area.max(axis=1, keepdims=True)
+        trapped[game[stuck], snake[stuck]] = (
+            safe[stuck] & (area < needed[stuck, None]) & ~roomiest
+        )
+        return trapped
+
+    def _needed_area(self):
+        # Free cells a move must reach not to be trapped, like the scalar
+        # trap check's threshold but at most TRAP_AREA.
+        needed = self.length + (self.growth != 0) + 2
+        return np.minimum(needed, TRAP_AREA)
+
+    def _open_area(self, game, snake, cells, needed):
+        # Free cells reachable from each of the given snakes' moves within
+        # TRAP_RADIUS of the cell it moves to, from flood fills made together
+        # and stopped at the square's edge, or once they reach the needed
+        # area. Each row of a square is a bit mask, so a fill step spreads a
+        # whole row at once. On a board narrower than the square, cells it
+        # wraps onto count twice.
+        width, height = self.grid_width, self.grid_height
+        span = self.trap_span
+        row_start = ((cells // width)[:, None] + span) % height * width
+        row_start += (game * self.owner.shape[1])[:, None]
+        column = ((cells % width)[:, None] + span) % width
+        window = row_start[:, :, None] + column[:, None, :]
+        occupant, birth = self._occupant_at(
+            game[:, None], window.reshape(cells.size, -1)
+        )
+        tail_birth = self.moves[game, snake] - self.length[game, snake] + 1
+        vacated = (
+            (occupant == snake[:, None])
+            & (birth == tail_birth[:, None])
+            & (self.growth[game, snake] == 0)[:, None]
+        )
+        side = self.column_bits.size
+        free = ((occupant < 0) | vacated).reshape(-1, side, side)
+        free = (free * self.column_bits).sum(axis=2, dtype=np.int32)
+
+        # Fills that stop growing or reach the needed area are set aside, so
+        # each step only spreads the ones still going.
+        area = np.ones(cells.size, dtype=np.int32)
+        current = np.zeros_like(free)
+        current[:, TRAP_RADIUS] = 1 << TRAP_RADIUS
+        growing = np.arange(cells.size)
+        while growing.size:
+            grown = current | current << 1 | current >> 1
+            grown[:, 1:] |= current[:, :-1]
+            grown[:, :-1] |= current[:, 1:]
+            grown &= free
+            count = self.popcount[grown].sum(axis=1, dtype=np.int32)
+            going = (count > area[growing]) & (count < needed[growing])
+            area[growing] = count
+            growing = growing[going]
+            current = grown[going]
+            free = free[going]
+        return area
+
+    # --- Simulation ---
+
+    def step(self):
+        # Advances every running game by one tick. Returns the number of
+        # games still running.
+        if not self.active.any():
+            return 0
+        active = self.active
+        num_snakes = self.num_snakes
+        self.ai_move_counter += 1
+        ai_moved = self.ai_move_counter >= self.ai_move_delay
+        if ai_moved:
+            self.ai_move_counter = 0
+
+        moves, has_safe = self._choose_moves(ai_moved)
+
+        # The player keeps its direction when stuck, and like
+        # GameState.set_player_direction() cannot reverse onto its neck.
+        chosen = moves[:, 0].astype(np.int8)
+        reverse = chosen ^ 1 == self.player_direction
+        keep = ~has_safe[:, 0] | (reverse & (self.length[:, 0] > 1))
+        self.player_direction = np.where(keep, self.player_direction, chosen)
+        new_heads = self.heads.copy()
+        new_heads[:, 0] = self.adjacent[self.heads[:, 0], self.player_direction]
+        if ai_moved:
+            ai_heads = np.take_along_axis(
+                self.adjacent[self.heads[:, 1:]], moves[:, 1:, None], axis=2
+            )[:, :, 0]
+            new_heads[:, 1:] = np.where(has_safe[:, 1:], ai_heads, self.heads[:, 1:])
+
+        # --- Collision Checks ---
+        player_head = new_heads[:, 0]
+        winner = np.zeros(self.n_games, dtype=np.int16)
+        tie = (new_heads[:, 1:] == player_head[:, None]).any(axis=1)
+        winner[tie] = TIE
+
+        occupant, birth = self._occupant(self.rows, player_head)
+        known = np.maximum(occupant, 0)
+        hit_head = birth == self.moves[self.rows, known]
+        tail_birth = self.moves[self.rows, known] - self.length[self.rows, known] + 1
+        hit_tail = (birth == tail_birth) & (self.growth[self.rows, known] == 0)
+        player_hit = (occupant >= 0) & ~hit_head & ~hit_tail
+        # Hitting an AI's head is not a collision in the scalar rules either.
+        winner[(winner == RUNNING) & player_hit] = AI_WINS
+
+        if ai_moved:
+            for snake in range(1, num_snakes):
+                head = new_heads[:, snake]
+                occupant, birth = self._occupant(self.rows, head)
+                self_hit = (
+                    (occupant == snake)
+                    & (birth != self.moves[:, snake])
+                    & ~(
+                        (birth == self.moves[:, snake] - self.length[:, snake] + 1)
+                        & (self.growth[:, snake] == 0)
+                    )
+                )
+                self_hit |= (
+                    ~has_safe[:, snake]
+                    & self.stuck[:, snake]
+                    & (self.length[:, snake] > 2)
+                )
+                winner[(winner == RUNNING) & self_hit] = PLAYER_WINS
+            for snake in range(1, num_snakes):
+                occupant, _ = self._occupant(self.rows, new_heads[:, snake])
+                winner[(winner == RUNNING) & (occupant == 0)] = PLAYER_WINS
+            self.stuck[:, 1:] = ~has_safe[:, 1:]
+
+        # --- Update Positions & Process Food ---
+        moving = active & (winner == RUNNING)
+        rows = self.rows[moving]
+        movers = range(num_snakes) if ai_moved else range(1)
+        for snake in movers:
+            heads = new_heads[rows, snake]
+            self.moves[rows, snake] += 1
+            self.owner[rows, heads] = snake + 1
+            self.birth[rows, heads] = self.moves[rows, snake]
+            self.heads[rows, snake] = heads
+            self._eat(rows, snake, heads)
+        missing = self.food_pos[rows] < 0
+        if missing.any():
+            game, slot = np.nonzero(missing)
+            self._spawn_food(rows[game], slot)
+
+        # --- Check Winning Condition (Individual Scores) ---
+        reached = self.scores >= self.win_score
+        ai_win = np.where(
+            reached[:, 1:].any(axis=1),
+            AI_SCORE_WIN + reached[:, 1:].argmax(axis=1),
+            RUNNING,
+        )
+        score_win = np.where(reached[:, 0], PLAYER_WINS, ai_win)
+        winner = np.where(score_win != RUNNING, score_win, winner)
+
+        self.tick += 1
+        ended = active & (winner != RUNNING)
+        self.winner[ended] = winner[ended]
+        self.ticks[ended] = self.tick
+        self.active = active & ~ended
+        return int(self.active.sum())
+
+    def run(self, max_ticks=100000):
+        # Plays until every game is over or max_ticks have passed; games
+        # still running then keep winner RUNNING.
+        while self.tick < max_ticks and self.step():
+            pass
+        self.ticks[self.active] = self.tick
+        return self.results()
+
+    def results(self):
+        return [
+            {
+                "winner": winner_name(int(self.winner[game])),
+                "ticks": int(self.ticks[game]),
+                "player_score": int(self.scores[game, 0]),
+                "ai_scores": [int(score) for score in self.scores[game, 1:]],
+            }
+            for game in range(self.n_games)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched headless Snake games.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    parser.add_argument(
+        "--ai", type=int, help="number of AI snakes, overriding --difficulty"
+    )
+    parser.add_argument("--win-score", type=int, help="overrides --difficulty")
+    parser.add_argument(
+        "--food", type=int, help="foods on the board (default scales with --ai)"
+    )
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    args = parser.parse_args()
+
+    win_score, num_ai = DIFFICULTY_PRESETS[args.difficulty]
+    if args.ai is not None:
+        num_ai = args.ai
+    if args.win_score is not None:
+        win_score = args.win_score
+    start = time.perf_counter()
+    batch = BatchGame(
+        args.games,
+        args.width,
+        args.height,
+        num_ai,
+        win_score,
+        seed=args.seed,
+        food_count=args.food,
+    )
+    results = batch.run(args.max_ticks)
+    elapsed = time.perf_counter() - start
+    game_ticks = int(batch.ticks.sum())
+    print(f"Games: {args.games}  Game ticks: {game_ticks}  Time: {elapsed:.3f}s")
+    print(f"Game ticks per second: {game_ticks / elapsed if elapsed else 0:.0f}")
+    winners = {}
+    for result in results:
+        winners[result["winner"]] = winners.get(result["winner"], 0) + 1
+    for winner, count in sorted(winners.items(), key=lambda kv: -kv[1]):
+        print(f"  {winner}: {count}")
+
+
+if __name__ == "__main__":
+    main()
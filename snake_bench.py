@@ -0,0 +1,318 @@
+import argparse
+import json
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import time
+
+from snake_engine import (
+    DIFFICULTY_PRESETS,
+    FreeCells,
+    GameState,
+    OccupancyGrid,
+    PLAYER_ID,
+    RegionMap,
+    SnakeBody,
+    collision_other,
+    collision_self,
+    compute_direction,
+    free_area,
+    get_random_food,
+    is_safe_move,
+    player_autopilot,
+    toroidal_distance,
+    will_be_trapped,
+)
+
+# Reproducible micro benchmarks of the pathing helpers plus end-to-end
+# headless ticks. Boards are built from a fixed seed; results are written as
+# JSON and can be compared against an earlier run with --compare.
+
+GRIDS = [(96, 54), (250, 250), (1000, 1000)]
+LENGTHS = [10, 100, 1000]
+OCCUPANCIES = [0.0, 0.1, 0.3]
+AI_COUNTS = [1, 2, 3]
+MIN_TIME = 0.2  # Seconds each case is repeated for.
+TICK_TIME = 2.0  # Seconds of play per end-to-end case.
+STARTUP_RUNS = 10  # Launches timed by --startup.
+HELPERS = [
+    "toroidal_distance",
+    "compute_direction",
+    "free_area",
+    "will_be_trapped",
+    "is_safe_move",
+    "collision_self",
+    "collision_other",
+    "get_random_food",
+    "grid.blocked",
+    "RegionMap.will_be_trapped",
+    "FreeCells.sample",
+]
+
+
+class Board:
+    # A player snake laid out in rows from the middle of the grid, and
+    # "occupancy" of the remaining cells held by other snakes.
+    def __init__(self, width, height, length, occupancy, seed=0):
+        rng = random.Random(seed)
+        self.size = (width, height)
+        length = min(length, width * height // 2)
+        x0, y0 = width // 4, height // 2
+        row = max(1, min(width // 2, length))
+        snake = []
+        for i in range(length):
+            y, x = divmod(i, row)
+            x = x if y % 2 == 0 else row - 1 - x
+            snake.append(((x0 + x) % width, (y0 - y) % height))
+        self.snake = snake  # Head first.
+        head = snake[0]
+        self.candidate = ((head[0] - 1) % width, head[1])
+
+        taken = set(snake)
+        taken.add(self.candidate)
+        cells = [
+            (x, y)
+            for x in range(width)
+            for y in range(height)
+            if (x, y) not in taken
+        ]
+        count = int(occupancy * width * height)
+        others = rng.sample(cells, min(count, len(cells)))
+        self.other_snakes = [
+            others[i : i + length] for i in range(0, len(others), length)
+        ]
+        self.obstacles = set(others) | set(snake)
+
+        self.grid = OccupancyGrid(width, height)
+        self.body = SnakeBody(snake, width)
+        for pos in snake:
+            self.grid.add(self.grid.index(pos), PLAYER_ID)
+        for idx, other in enumerate(self.other_snakes):
+            for pos in other:
+                self.grid.add(self.grid.index(pos), idx + 2)
+        self.free_cells = FreeCells(width * height)
+        for pos in self.obstacles:
+            self.free_cells.discard(self.grid.index(pos))
+        self.cell = self.grid.index(self.candidate)
+
+
+def helper_cases(board):
+    # name -> zero-argument callable over this board.
+    size = board.size
+    snake = board.snake
+    candidate = board.candidate
+    other = board.other_snakes[0] if board.other_snakes else snake
+    far = (size[0] - 1 - candidate[0], size[1] - 1 - candidate[1])
+    limit = len(snake) + 13
+    rng = random.Random(0)
+    grid = board.grid
+    return {
+        "toroidal_distance": lambda: toroidal_distance(candidate, far, size),
+        "compute_direction": lambda: compute_direction(candidate, far, size),
+        "free_area": lambda: free_area(candidate, board.obstacles, size, limit),
+        "will_be_trapped": lambda: will_be_trapped(
+            snake, candidate, 0, size, board.other_snakes
+        ),
+        "is_safe_move": lambda: is_safe_move(
+            candidate, snake, 0, board.other_snakes
+        ),
+        "collision_self": lambda: collision_self(snake, candidate, 0),
+        "collision_other": lambda: collision_other(candidate, other, 0),
+        "get_random_food": lambda: get_random_food(board.obstacles, *size, rng=rng),
+        # The grid-backed versions the engine uses, for comparison.
+        "grid.blocked": lambda: grid.blocked(board.cell, board.body, PLAYER_ID, 0),
+        "RegionMap.will_be_trapped": lambda: RegionMap(
+            grid, limit
+        ).will_be_trapped(board.body, board.cell, 0),
+        "FreeCells.sample": lambda: board.free_cells.sample(rng),
+    }
+
+
+def measure(func, min_time=MIN_TIME):
+    # Seconds per call, calling in growing batches until min_time has passed.
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            func()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls, calls
+        batch *= 2
+
+
+def measure_ticks(width, height, num_ai, tick_time=TICK_TIME):
+    # Headless ticks per second with the autopilot player, starting a new
+    # seeded game whenever one ends.
+    win_score = DIFFICULTY_PRESETS[min(num_ai, 3)][0]
+    ticks = 0
+    seed = 0
+    state = GameState(width, height, num_ai, win_score, seed=seed)
+    start = time.perf_counter()
+    while time.perf_counter() - start < tick_time:
+        if state.step(player_autopilot(state)):
+            seed += 1
+            state = GameState(width, height, num_ai, win_score, seed=seed)
+        ticks += 1
+    return ticks / (time.perf_counter() - start), ticks
+
+
+def case_key(case):
+    return (
+        case["name"],
+        tuple(case["grid"]),
+        case.get("length"),
+        case.get("occupancy"),
+        case.get("num_ai"),
+    )
+
+
+def run(grids, lengths, occupancies, ai_counts, pattern, min_time, tick_time):
+    results = []
+    for width, height in grids:
+        for length in lengths:
+            for occupancy in occupancies:
+                if pattern and not any(pattern in name for name in HELPERS):
+                    continue
+                board = Board(width, height, length, occupancy)
+                for name, func in helper_cases(board).items():
+                    if pattern and pattern not in name:
+                        continue
+                    seconds, calls = measure(func, min_time)
+                    results.append(
+                        {
+                            "name": name,
+                            "grid": [width, height],
+                            "length": length,
+                            "occupancy": occupancy,
+                            "us_per_call": seconds * 1e6,
+                            "calls": calls,
+                        }
+                    )
+                    print(
+                        f"{name:<26} {width}x{height} len={length} "
+                        f"occ={occupancy}: {seconds * 1e6:10.2f} us"
+                    )
+        for num_ai in ai_counts:
+            if pattern and pattern not in "ticks":
+                continue
+            rate, ticks = measure_ticks(width, height, num_ai, tick_time)
+            results.append(
+                {
+                    "name": "ticks",
+                    "grid": [width, height],
+                    "num_ai": num_ai,
+                    "ticks_per_second": rate,
+                    "ticks": ticks,
+                }
+            )
+            print(f"{'ticks':<26} {width}x{height} ai={num_ai}: {rate:10.1f} ticks/s")
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Prints the change of every case found in both runs; returns the cases
+    # that got more than threshold slower.
+    old = {case_key(case): case for case in baseline["results"]}
+    regressions = []
+    for case in results:
+        before = old.get(case_key(case))
+        if before is None:
+            continue
+        if case["name"] == "ticks":
+            ratio = before["ticks_per_second"] / case["ticks_per_second"]
+        else:
+            ratio = case["us_per_call"] / before["us_per_call"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(case)
+        print(f"{case['name']:<26} {case_key(case)[1:]}: {ratio:6.2f}x time{flag}")
+    return regressions
+
+
+def measure_startup(command, runs):
+    # Wall time of whole launches to the first menu frame, so interpreter
+    # start, imports and unpacking a onefile build all count.
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command + ["--startup-time"], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times
+
+
+def parse_grid(text):
+    width, height = text.lower().split("x")
+    return (int(width), int(height))
+
+
+def parse_list(kind):
+    return lambda text: [kind(item) for item in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snake benchmark suite.")
+    parser.add_argument(
+        "--grid", type=parse_grid, action="append", help="WxH (repeatable)"
+    )
+    parser.add_argument("--lengths", type=parse_list(int), default=LENGTHS)
+    parser.add_argument("--occupancy", type=parse_list(float), default=OCCUPANCIES)
+    parser.add_argument("--ai", type=parse_list(int), default=AI_COUNTS)
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--tick-time", type=float, default=TICK_TIME)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", metavar="JSON", help="earlier run to compare")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="slowdown that fails --compare"
+    )
+    parser.add_argument(
+        "--startup",
+        type=shlex.split,
+        metavar="COMMAND",
+        help="time launches of the game instead, e.g. 'python SnakePython.py' "
+        "or 'dist/SnakePython/SnakePython.exe'",
+    )
+    parser.add_argument("--runs", type=int, default=STARTUP_RUNS)
+    args = parser.parse_args()
+
+    if args.startup:
+        times = measure_startup(args.startup, args.runs)
+        print(
+            f"startup: min {times[0] * 1000:.0f} ms, "
+            f"median {times[len(times) // 2] * 1000:.0f} ms over {len(times)} runs"
+        )
+        return
+
+    results = run(
+        args.grid or GRIDS,
+        args.lengths,
+        args.occupancy,
+        args.ai,
+        args.filter,
+        args.min_time,
+        args.tick_time,
+    )
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
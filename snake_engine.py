@@ -0,0 +1,1772 @@
+import argparse
+import copy
+import math
+import random
+import time
+from array import array
+from collections import deque
+from functools import lru_cache
+from heapq import heappop, heappush, nsmallest
+from itertools import islice
+
+# Headless game rules. Nothing in this module imports pygame, so matches can be
+# simulated without a display and as fast as the CPU allows.
+
+# --- Constants for Food Types ---
+NORMAL_FOOD_VALUE = 1  # Red food (normal) counts as 1 point.
+YELLOW_FOOD_VALUE = 1  # Yellow food counts as 1 point.
+GOLD_FOOD_VALUE = 2  # Gold food (special) counts as 2 points.
+
+NORMAL_GROWTH = 4  # Red and yellow food cause 4 segments of growth.
+GOLD_GROWTH = 8  # Gold food causes 8 segments of growth.
+
+# Food type probabilities:
+PROB_RED = 0.3
+PROB_YELLOW = 0.5
+# (Remaining probability for gold is 0.2)
+
+# Global speed variables
+BASE_FPS = 8  # Base game speed.
+FPS_INCREMENT = 1  # Increase overall FPS by 1 every 5 foods eaten.
+
+FOOD_COUNT = 5  # Foods on the board at any time.
+ARENA_FOOD_PER_AI = 1  # Foods per AI snake once there are more than FOOD_COUNT.
+AI_MOVE_DELAY = 2  # AI snakes update every 2 ticks.
+# Steps from food the food distance field reaches; farther cells read as
+# unreachable. Beyond the default boards' diameter, but it bounds the cells
+# repaired when a food is eaten on large arenas.
+FOOD_SEARCH_RANGE = 128
+# Foods from which the greedy AI ranks moves by the distance field. With
+# fewer, keeping the field costs more than the whole rest of a tick, so it
+# heads for the food nearest by toroidal distance instead.
+FOOD_FIELD_MIN = 100
+# Cells the planning AI may expand per AI tick, shared evenly by the AI snakes
+# but never fewer than PLANNER_MIN_NODES each.
+PLANNER_BUDGET = 20000
+PLANNER_MIN_NODES = 64
+PLANNER_TARGETS = 4  # Nearest foods each plan may end at.
+PLANNER_BUCKET = 16  # Side of the squares foods and heads are looked up by.
+# Ticks the search AI may play out per AI tick, shared evenly by the AI snakes
+# but never fewer than SEARCH_MIN_NODES each.
+SEARCH_BUDGET = 4000
+SEARCH_MIN_NODES = 50
+SEARCH_DEPTH = 4  # Most moves of its own the search AI looks ahead.
+SEARCH_SPACE = 16  # Free cells a searched position must reach to not be a trap.
+SEARCH_DECIDED = 1000000  # Value of a crash, beyond any position's score.
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+PLAYER_ID = 1  # Occupancy owner id of the player; AI snake idx is idx + 2.
+MIXED_OWNER = 0xFFFF  # Owner id of a cell that has held several snakes.
+
+# Start menu presets: difficulty -> (win_score, num_ai)
+DIFFICULTY_PRESETS = {1: (15, 1), 2: (20, 2), 3: (25, 3)}
+
+# --- Utility Functions ---
+
+
+def compute_direction(current, next_cell, grid_size):
+    grid_width, grid_height = grid_size
+    dx = next_cell[0] - current[0]
+    dy = next_cell[1] - current[1]
+    if dx > grid_width // 2:
+        dx -= grid_width
+    elif dx < -grid_width // 2:
+        dx += grid_width
+    if dy > grid_height // 2:
+        dy -= grid_height
+    elif dy < -grid_height // 2:
+        dy += grid_height
+    return (dx, dy)
+
+
+def toroidal_distance(a, b, grid_size):
+    grid_width, grid_height = grid_size
+    dx = abs(a[0] - b[0])
+    dx = min(dx, grid_width - dx)
+    dy = abs(a[1] - b[1])
+    dy = min(dy, grid_height - dy)
+    return dx + dy
+
+
+def is_safe_move(candidate, snake, growth, other_snakes):
+    if candidate in snake:
+        if candidate == snake[-1] and growth == 0:
+            pass
+        else:
+            return False
+    for other in other_snakes:
+        if candidate in other:
+            return False
+    return True
+
+
+def collision_self(snake, new_head, growth):
+    if len(snake) <= 1:
+        return False
+    for segment in islice(snake, 1, len(snake) - 1):
+        if new_head == segment:
+            return True
+    if new_head == snake[-1] and growth != 0:
+        return True
+    return False
+
+
+def collision_other(new_head, other_snake, other_growth):
+    if len(other_snake) < 2:
+        return False
+    for i, segment in enumerate(islice(other_snake, 1, None), start=1):
+        if new_head == segment:
+            if i == len(other_snake) - 1 and other_growth == 0:
+                continue
+            return True
+    return False
+
+
+def free_area(start, obstacles, grid_size, limit=50):
+    grid_width, grid_height = grid_size
+    q = deque([start])
+    seen = set([start])
+    count = 0
+    while q and count < limit:
+        cell = q.popleft()
+        count += 1
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nxt = ((cell[0] + dx) % grid_width, (cell[1] + dy) % grid_height)
+            if nxt not in seen and nxt not in obstacles:
+                seen.add(nxt)
+                q.append(nxt)
+    return count
+
+
+def will_be_trapped(snake, candidate, growth, grid_size, other_snakes):
+    # Obstacles are the body after moving to candidate; the moved body is
+    # never built as a list.
+    if growth == 0:
+        obstacles = set(islice(snake, 0, len(snake) - 1))
+    else:
+        obstacles = set(snake)
+    obstacles.add(candidate)
+    for s in other_snakes:
+        obstacles |= set(s)
+    threshold = len(snake) + (growth != 0) + 2
+    area = free_area(candidate, obstacles, grid_size, limit=threshold + 10)
+    return area < threshold
+
+
+def get_random_food(obstacles, grid_width, grid_height, rng=random):
+    pos = (rng.randint(0, grid_width - 1), rng.randint(0, grid_height - 1))
+    while pos in obstacles:
+        pos = (rng.randint(0, grid_width - 1), rng.randint(0, grid_height - 1))
+    return make_food(pos, rng)
+
+
+def make_food(pos, rng=random):
+    # Picks the food type for pos using the PROB_* weights.
+    p = rng.random()
+    if p < PROB_RED:
+        return (pos, NORMAL_FOOD_VALUE, "red")
+    elif p < PROB_RED + PROB_YELLOW:
+        return (pos, YELLOW_FOOD_VALUE, "yellow")
+    else:
+        return (pos, GOLD_FOOD_VALUE, "gold")
+
+
+def food_reward(food):
+    # Returns (score, growth) for eating the given food.
+    if food[1] == NORMAL_FOOD_VALUE:
+        return (NORMAL_FOOD_VALUE, NORMAL_GROWTH)
+    elif food[1] == YELLOW_FOOD_VALUE:
+        return (YELLOW_FOOD_VALUE, NORMAL_GROWTH)
+    else:
+        return (GOLD_FOOD_VALUE, GOLD_GROWTH)
+
+
+def arena_food_count(num_ai):
+    # Default food count: FOOD_COUNT, or more on arenas with many AI snakes so
+    # food stays within reach of each of them.
+    return max(FOOD_COUNT, ARENA_FOOD_PER_AI * num_ai)
+
+
+def ai_start_positions(num_ai, grid_width, grid_height):
+    # Up to three AIs start in a column left of centre. Larger fields are
+    # spread over an even lattice covering the board, minus the slot nearest
+    # the player's start, so the spawn spacing scales with the snake count.
+    if num_ai <= 3:
+        offsets = [[], [0], [-2, 2], [-4, 0, 4]][num_ai]
+        return [
+            (grid_width // 4, (grid_height // 2 + off) % grid_height)
+            for off in offsets
+        ]
+    slots = num_ai + 1
+    if slots > grid_width * grid_height:
+        raise ValueError(
+            f"{num_ai} AI snakes do not fit a {grid_width}x{grid_height} grid"
+        )
+    cols = round(math.sqrt(slots * grid_width / grid_height))
+    cols = max(1, min(grid_width, cols))
+    rows = -(-slots // cols)
+    if rows > grid_height:
+        rows = grid_height
+        cols = -(-slots // rows)
+    positions = [
+        (
+            (2 * i + 1) * grid_width // (2 * cols),
+            (2 * j + 1) * grid_height // (2 * rows),
+        )
+        for j in range(rows)
+        for i in range(cols)
+    ]
+    player = (3 * grid_width // 4, grid_height // 2)
+    size = (grid_width, grid_height)
+    positions.remove(
+        min(positions, key=lambda pos: toroidal_distance(pos, player, size))
+    )
+    return positions[:num_ai]
+
+
+# --- Snake Bodies ---
+
+
+class SnakeBody:
+    # Snake segments as packed cell indices (y * width + x), head first, so
+    # pushing a head and popping the tail are O(1). Indexing and iteration
+    # give (x, y) tuples like the plain lists the helpers above accept.
+    __slots__ = ("cells", "width")
+
+    def __init__(self, positions, width):
+        self.width = width
+        self.cells = deque(y * width + x for x, y in positions)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        width = self.width
+        for cell in self.cells:
+            yield (cell % width, cell // width)
+
+    def __getitem__(self, i):
+        cell = self.cells[i]
+        return (cell % self.width, cell // self.width)
+
+    def __contains__(self, pos):
+        return pos[1] * self.width + pos[0] in self.cells
+
+    @property
+    def head(self):
+        return self.cells[0]
+
+    @property
+    def tail(self):
+        return self.cells[-1]
+
+    def push_head(self, cell):
+        self.cells.appendleft(cell)
+
+    def pop_tail(self):
+        return self.cells.pop()
+
+    def vacated(self, growth):
+        # Cell index freed by the next move with this growth, or -1.
+        return self.cells[-1] if growth == 0 else -1
+
+    def copy(self):
+        snake = SnakeBody.__new__(SnakeBody)
+        snake.width = self.width
+        snake.cells = deque(self.cells)
+        return snake
+
+
+# --- Occupancy Grid ---
+
+
+@lru_cache(maxsize=8)
+def neighbor_tables(width, height):
+    # Right, left, down and up neighbor of every cell index on the torus,
+    # shared by all grids of the same size.
+    size = width * height
+    right = array("i", range(1, size + 1))
+    left = array("i", range(-1, size - 1))
+    for row in range(0, size, width):
+        right[row + width - 1] = row
+        left[row] = row + width - 1
+    down = array("i", range(width, size + width))
+    down[size - width :] = array("i", range(width))
+    up = array("i", range(-width, size - width))
+    up[:width] = array("i", range(size - width, size))
+    return right, left, down, up
+
+
+class OccupancyGrid:
+    # Per-cell segment counts and owner ids, updated as heads are pushed and
+    # tails popped so collision and safety checks never scan a snake body.
+    # Cells that several snakes have shared are marked MIXED_OWNER and fall
+    # back to counting the segments in the snake that is asked about.
+    __slots__ = ("width", "height", "counts", "owners", "version", "adjacent")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.counts = bytearray(width * height)
+        self.owners = array("H", bytes(2 * width * height))
+        self.version = 0  # Bumped on every change.
+        self.adjacent = neighbor_tables(width, height)
+
+    def index(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def pos(self, cell):
+        return (cell % self.width, cell // self.width)
+
+    def copy(self):
+        grid = OccupancyGrid.__new__(OccupancyGrid)
+        grid.width = self.width
+        grid.height = self.height
+        grid.counts = bytearray(self.counts)
+        grid.owners = array("H", self.owners)
+        grid.version = self.version
+        grid.adjacent = self.adjacent
+        return grid
+
+    def neighbor(self, cell, direction):
+        width = self.width
+        x = (cell % width + direction[0]) % width
+        y = (cell // width + direction[1]) % self.height
+        return y * width + x
+
+    def neighbors(self, cell):
+        right, left, down, up = self.adjacent
+        return (right[cell], left[cell], down[cell], up[cell])
+
+    def __contains__(self, pos):
+        return self.counts[pos[1] * self.width + pos[0]] > 0
+
+    def add(self, cell, owner):
+        if self.counts[cell] == 0:
+            self.owners[cell] = owner
+        elif self.owners[cell] != owner:
+            self.owners[cell] = MIXED_OWNER
+        self.counts[cell] += 1
+        self.version += 1
+
+    def remove(self, cell):
+        self.counts[cell] -= 1
+        if self.counts[cell] == 0:
+            self.owners[cell] = 0
+        self.version += 1
+
+    def owned(self, cell, owner, snake):
+        # Number of segments of snake (with the given owner id) on cell.
+        count = self.counts[cell]
+        if count == 0:
+            return 0
+        if self.owners[cell] == MIXED_OWNER:
+            return snake.cells.count(cell)
+        return count if self.owners[cell] == owner else 0
+
+    def blocked(self, candidate, snake, owner, growth):
+        # Grid version of is_safe_move (negated): every other snake blocks,
+        # the own tail does not when it vacates this tick.
+        own = self.owned(candidate, owner, snake)
+        if self.counts[candidate] > own:
+            return True
+        return own > 0 and not (candidate == snake.tail and growth == 0)
+
+    def collides_self(self, snake, owner, new_head, growth):
+        if len(snake) <= 1:
+            return False
+        own = self.owned(new_head, owner, snake)
+        if own == 0:
+            return False
+        if new_head == snake.head:
+            own -= 1
+        if new_head == snake.tail:
+            if growth != 0:
+                return True
+            own -= 1
+        return own > 0
+
+    def collides_other(self, new_head, other_snake, other_owner, other_growth):
+        if len(other_snake) < 2:
+            return False
+        own = self.owned(new_head, other_owner, other_snake)
+        if own == 0:
+            return False
+        if new_head == other_snake.head:
+            own -= 1
+        if new_head == other_snake.tail and other_growth == 0:
+            own -= 1
+        return own > 0
+
+
+# --- Free Cells ---
+
+
+class FreeCells:
+    # Indices of the cells holding neither a snake nor food, kept in an array
+    # with a position map so adding, removing and sampling are all O(1) no
+    # matter how full the board is.
+    __slots__ = ("cells", "where")
+
+    def __init__(self, size):
+        self.cells = array("i", range(size))
+        self.where = array("i", range(size))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.where[cell] != -1
+
+    def add(self, cell):
+        if self.where[cell] == -1:
+            self.where[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        i = self.where[cell]
+        if i == -1:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.where[last] = i
+        self.where[cell] = -1
+
+    def sample(self, rng=random):
+        # A uniformly random free cell, or None when the board is full.
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+# --- Region Analysis ---
+
+
+class RegionMap:
+    # Sizes of the free regions of the board (cells no snake occupies), shared
+    # by every trap check made on one board position. Regions are labelled on
+    # demand by flood fills that stop after `limit` cells: no query needs to
+    # know more than that a region is at least that big.
+    __slots__ = ("grid", "limit", "version", "labels", "sizes")
+
+    def __init__(self, grid, limit):
+        self.grid = grid
+        self.limit = limit
+        self.version = grid.version
+        self.labels = {}
+        self.sizes = []
+
+    def label(self, cell):
+        label = self.labels.get(cell)
+        if label is not None:
+            return label
+        labels = self.labels
+        counts = self.grid.counts
+        neighbors = self.grid.neighbors
+        label = len(self.sizes)
+        labels[cell] = label
+        filled = [cell]
+        q = deque(filled)
+        count = 0
+        while q:
+            current = q.popleft()
+            count += 1
+            if count >= self.limit:
+                break
+            for nxt in neighbors(current):
+                if counts[nxt]:
+                    continue
+                other = labels.get(nxt, label)
+                if other != label:
+                    # Ran into a region an earlier fill already found to be
+                    # at least limit cells.
+                    for filled_cell in filled:
+                        labels[filled_cell] = other
+                    return other
+                if nxt not in labels:
+                    labels[nxt] = label
+                    filled.append(nxt)
+                    q.append(nxt)
+        self.sizes.append(min(count, self.limit))
+        return label
+
+    def reachable(self, candidate, vacated, limit):
+        # free_area() from candidate once a snake's head is on it and its
+        # tail has left the vacated cell (-1 if it stays), capped at limit.
+        counts = self.grid.counts
+        neighbors = self.grid.neighbors
+        regions = set()
+        extra = 0
+        if counts[candidate] == 0:
+            regions.add(self.label(candidate))
+        else:
+            extra += 1
+            for nxt in neighbors(candidate):
+                if counts[nxt] == 0:
+                    regions.add(self.label(nxt))
+        if vacated != -1 and vacated != candidate and counts[vacated] == 1:
+            tail_regions = set()
+            for nxt in neighbors(vacated):
+                if counts[nxt] == 0:
+                    tail_regions.add(self.label(nxt))
+            if candidate in neighbors(vacated) or tail_regions & regions:
+                regions |= tail_regions
+                extra += 1
+        total = extra + sum(self.sizes[label] for label in regions)
+        return min(total, limit)
+
+    def will_be_trapped(self, snake, candidate, growth):
+        threshold = len(snake) + (growth != 0) + 2
+        area = self.reachable(candidate, snake.vacated(growth), threshold + 10)
+        return area < threshold
+
+
+# --- Food Distances ---
+
+
+class DistanceField:
+    # Steps from each cell to the nearest food, moving only through cells no
+    # snake occupies, up to FOOD_SEARCH_RANGE; other cells read -1. Built by
+    # one multi-source BFS seeded at every food, then kept across ticks:
+    # update() repairs only the cells whose distance the changed cells can
+    # affect, instead of searching the board again.
+    __slots__ = ("dist", "reach", "visited", "buckets")
+
+    def __init__(self, grid, food_cells, reach=FOOD_SEARCH_RANGE):
+        self.reach = reach
+        self.dist = array("i", [-1]) * (grid.width * grid.height)
+        # Cells by level for update(), kept empty between calls.
+        self.buckets = [[] for _ in range(reach + 2)]
+        self.build(grid, food_cells)
+
+    def copy(self):
+        field = DistanceField.__new__(DistanceField)
+        field.reach = self.reach
+        field.dist = array("i", self.dist)
+        field.visited = 0
+        field.buckets = [[] for _ in range(self.reach + 2)]
+        return field
+
+    def distance(self, cell):
+        # BFS distance from cell to the nearest reachable food, or -1.
+        return self.dist[cell]
+
+    def build(self, grid, food_cells):
+        # Searches the whole field again, level by level from every food.
+        dist = self.dist
+        dist[:] = array("i", [-1]) * len(dist)
+        counts = grid.counts
+        right, left, down, up = grid.adjacent
+        frontier = list(food_cells)
+        for cell in frontier:
+            dist[cell] = 0
+        self.visited = len(frontier)  # Cells set by the last build or update.
+        for level in range(1, self.reach + 1):
+            if not frontier:
+                break
+            next_frontier = []
+            for nxt in [
+                n
+                for c in frontier
+                for n in (right[c], left[c], down[c], up[c])
+                if dist[n] == -1 and not counts[n]
+            ]:
+                if dist[nxt] == -1:
+                    dist[nxt] = level
+                    next_frontier.append(nxt)
+            frontier = next_frontier
+            self.visited += len(frontier)
+
+    def update(self, grid, changed, food_at):
+        # Repairs the field for grid after the cells in changed were taken,
+        # freed, or gained or lost a food. Cells whose distance leaned on a
+        # changed cell are cleared level by level, then all of them and the
+        # changed cells are filled in again from their neighbours, spreading
+        # any shorter distances outward. An eaten food can clear a large
+        # share of the board, which is searched again faster with build().
+        dist = self.dist
+        counts = grid.counts
+        adjacent = grid.adjacent
+        reach = self.reach
+        rebuild = len(dist) // 4
+        buckets = self.buckets
+        cleared = set()
+        top = 0  # Highest bucket in use.
+        for cell in changed:
+            if dist[cell] != -1 and cell not in cleared:
+                cleared.add(cell)
+                buckets[dist[cell] + 1].append(cell)
+                top = max(top, dist[cell] + 1)
+        level = 1
+        while level <= min(top, reach):
+            for parent in buckets[level]:
+                for table in adjacent:
+                    cell = table[parent]
+                    if dist[cell] != level or cell in cleared:
+                        continue
+                    for other in adjacent:
+                        near = other[cell]
+                        if dist[near] == level - 1 and near not in cleared:
+                            break
+                    else:
+                        cleared.add(cell)
+                        buckets[level + 1].append(cell)
+            if buckets[level + 1]:
+                top = max(top, level + 1)
+            if len(cleared) > rebuild:
+                for bucket in buckets[: top + 1]:
+                    bucket.clear()
+                self.build(grid, food_at)
+                return
+            level += 1
+        for bucket in buckets[: top + 1]:
+            bucket.clear()
+
+        for cell in cleared:
+            dist[cell] = -1
+        top = -1
+        for cell in cleared.union(changed):
+            if counts[cell]:
+                continue
+            if cell in food_at:
+                best = 0
+            else:
+                best = -1
+                for table in adjacent:
+                    near = dist[table[cell]]
+                    if near != -1 and (best == -1 or near + 1 < best):
+                        best = near + 1
+                if best == -1 or best > reach:
+                    continue
+            if dist[cell] == -1 or best < dist[cell]:
+                dist[cell] = best
+                buckets[best].append(cell)
+                top = max(top, best)
+        visited = 0
+        level = 0
+        while level <= top:
+            for cell in buckets[level]:
+                if dist[cell] != level:
+                    continue
+                visited += 1
+                if level == reach:
+                    continue
+                for table in adjacent:
+                    nxt = table[cell]
+                    if not counts[nxt] and (dist[nxt] == -1 or dist[nxt] > level + 1):
+                        dist[nxt] = level + 1
+                        buckets[level + 1].append(nxt)
+            buckets[level].clear()
+            if level < reach and buckets[level + 1]:
+                top = max(top, level + 1)
+            level += 1
+        self.visited = visited
+
+
+def nearest_food_move(grid, food_cells, head, safe_moves):
+    # Of safe_moves, the one nearest by toroidal distance to the food nearest
+    # the head, ignoring bodies in between; None without food.
+    if not food_cells:
+        return None
+    grid_size = (grid.width, grid.height)
+    head_pos = grid.pos(head)
+    target = grid.pos(
+        min(
+            food_cells,
+            key=lambda cell: toroidal_distance(head_pos, grid.pos(cell), grid_size),
+        )
+    )
+    best_move = None
+    best_distance = -1
+    for move, candidate in safe_moves:
+        dist = toroidal_distance(grid.pos(candidate), target, grid_size)
+        if best_move is None or dist < best_distance:
+            best_distance = dist
+            best_move = move
+    return best_move
+
+
+def choose_ai_direction(state, snake, owner, growth):
+    # Among moves that do not trap the snake, steps to the cell closest to a
+    # food by the shared distance field, or toward the nearest food while
+    # there are fewer than FOOD_FIELD_MIN. Returns None when no safe move
+    # exists.
+    grid = state.grid
+    regions = state.regions()
+    head = snake.head
+    safe_moves = []
+    for move in DIRECTIONS:
+        candidate = grid.neighbor(head, move)
+        if grid.blocked(candidate, snake, owner, growth):
+            continue
+        if not regions.will_be_trapped(snake, candidate, growth):
+            safe_moves.append((move, candidate))
+    if not safe_moves:
+        return None
+    if len(state.food_at) < FOOD_FIELD_MIN:
+        best_move = nearest_food_move(grid, state.food_at, head, safe_moves)
+        if best_move is None:
+            return state.rng.choice(safe_moves)[0]
+        return best_move
+    distances = state.distances()
+    best_move = None
+    best_distance = -1
+    for move, candidate in safe_moves:
+        dist = distances.distance(candidate)
+        if dist != -1 and (best_move is None or dist < best_distance):
+            best_distance = dist
+            best_move = move
+    if best_move is None:
+        # No food is reachable, or within the search budget, from any safe
+        # move.
+        return state.rng.choice(safe_moves)[0]
+    return best_move
+
+
+# --- Path Planning ---
+
+
+class BucketIndex:
+    # Cells grouped by PLANNER_BUCKET square of the board, so the planner can
+    # look at the foods and heads near a cell without scanning all of them.
+    __slots__ = ("width", "columns", "rows", "buckets")
+
+    def __init__(self, grid, cells):
+        self.width = grid.width
+        self.columns = -(-grid.width // PLANNER_BUCKET)
+        self.rows = -(-grid.height // PLANNER_BUCKET)
+        self.buckets = {}
+        for cell in cells:
+            self.buckets.setdefault(self.key(cell), []).append(cell)
+
+    def key(self, cell):
+        width = self.width
+        return ((cell % width) // PLANNER_BUCKET, (cell // width) // PLANNER_BUCKET)
+
+    def span(self):
+        # Radius at which near() covers the whole board.
+        return max(self.columns, self.rows) // 2
+
+    def near(self, cell, radius):
+        # Cells in the buckets up to radius buckets from the one holding cell.
+        x, y = self.key(cell)
+        radius_x = min(radius, self.columns // 2)
+        radius_y = min(radius, self.rows // 2)
+        keys = dict.fromkeys(
+            ((x + dx) % self.columns, (y + dy) % self.rows)
+            for dy in range(-radius_y, radius_y + 1)
+            for dx in range(-radius_x, radius_x + 1)
+        )
+        cells = []
+        for key in keys:
+            cells.extend(self.buckets.get(key, ()))
+        return cells
+
+
+class PathPlanner:
+    # Paths of the "planner" AI, kept across ticks. A path is only dropped
+    # when a snake moves onto one of its cells or its food is eaten, found
+    # through on_path and targets, or when a food spawns nearer than the
+    # path's end, so most AI ticks just take the next step.
+    __slots__ = (
+        "paths",
+        "targets",
+        "on_path",
+        "new_food",
+        "budget",
+        "expanded",
+        "foods",
+        "heads",
+    )
+
+    def __init__(self, num_ai, budget=PLANNER_BUDGET):
+        self.paths = [deque() for _ in range(num_ai)]  # Cells after the head.
+        self.targets = [-1] * num_ai  # Food cell each path leads to.
+        self.on_path = {}  # cell -> indices of the AIs whose path crosses it
+        self.new_food = []  # Food cells spawned since the last AI tick.
+        self.budget = budget
+        self.expanded = 0  # Cells expanded since the last AI tick.
+        self.foods = None  # BucketIndex of the food cells, built on demand.
+        self.heads = None  # BucketIndex of the AI heads this AI tick.
+
+    def food_index(self, state):
+        if self.foods is None:
+            self.foods = BucketIndex(state.grid, state.food_at)
+        return self.foods
+
+    def head_index(self, state):
+        if self.heads is None:
+            heads = [snake.head for snake in state.ai_snakes]
+            self.heads = BucketIndex(state.grid, heads)
+        return self.heads
+
+    def share(self):
+        # Expansion limit of the next search: an even share of the budget, or
+        # what is left of it this AI tick.
+        share = self.budget // max(1, len(self.paths))
+        return max(PLANNER_MIN_NODES, min(share, self.budget - self.expanded))
+
+    def set_path(self, idx, path, target):
+        self.drop(idx)
+        self.paths[idx].extend(path)
+        self.targets[idx] = target
+        for cell in path:
+            self.on_path.setdefault(cell, set()).add(idx)
+
+    def drop(self, idx):
+        path = self.paths[idx]
+        for cell in path:
+            users = self.on_path.get(cell)
+            if users is not None:
+                users.discard(idx)
+                if not users:
+                    del self.on_path[cell]
+        path.clear()
+        self.targets[idx] = -1
+
+    def advance(self, idx):
+        # Takes the next step of a path.
+        cell = self.paths[idx].popleft()
+        users = self.on_path[cell]
+        users.discard(idx)
+        if not users:
+            del self.on_path[cell]
+        return cell
+
+    def blocked(self, cell):
+        # A head moved onto cell.
+        users = self.on_path.get(cell)
+        if users:
+            for idx in list(users):
+                self.drop(idx)
+
+    def food_eaten(self, cell):
+        self.foods = None
+        for idx, target in enumerate(self.targets):
+            if target == cell:
+                self.drop(idx)
+
+    def find_path(self, grid, start, goals, limit, vacated=-1):
+        # A* from start through free cells (plus vacated, and the goals even
+        # if occupied) to the nearest of goals, by toroidal Manhattan distance.
+        # Returns the cells after start up to that goal. When limit cells have
+        # been expanded first, returns the path to the expanded cell nearest a
+        # goal instead, or None if no goal can be reached at all.
+        width = grid.width
+        height = grid.height
+        counts = grid.counts
+        right, left, down, up = grid.adjacent
+        targets = [(goal % width, goal // width) for goal in goals]
+
+        def estimate(cell):
+            x = cell % width
+            y = cell // width
+            best = width + height
+            for goal_x, goal_y in targets:
+                dx = abs(x - goal_x)
+                dy = abs(y - goal_y)
+                best = min(best, min(dx, width - dx) + min(dy, height - dy))
+            return best
+
+        best = start
+        best_estimate = estimate(start)
+        parents = {start: -1}
+        costs = {start: 0}
+        closed = set()
+        heap = [(best_estimate, best_estimate, start)]
+        expanded = 0
+        while heap:
+            _, remaining, cell = heappop(heap)
+            if cell in closed:
+                continue
+            if cell in goals:
+                best = cell
+                break
+            closed.add(cell)
+            expanded += 1
+            if remaining < best_estimate:
+                best = cell
+                best_estimate = remaining
+            if expanded >= limit:
+                break
+            cost = costs[cell] + 1
+            for nxt in (right[cell], left[cell], down[cell], up[cell]):
+                if nxt in closed:
+                    continue
+                if counts[nxt] and nxt != vacated and nxt not in goals:
+                    continue
+                if cost < costs.get(nxt, cost + 1):
+                    costs[nxt] = cost
+                    parents[nxt] = cell
+                    remaining = estimate(nxt)
+                    heappush(heap, (cost + remaining, remaining, nxt))
+        else:
+            best = start  # Every reachable cell was expanded.
+        self.expanded += expanded
+        if best == start:
+            return None
+        path = []
+        while best != start:
+            path.append(best)
+            best = parents[best]
+        path.reverse()
+        return path
+
+
+def nearest_foods(state, cell, count):
+    # About the count food cells closest to cell by toroidal distance: the
+    # closest among those in the buckets around the first ring of buckets
+    # that holds count of them.
+    index = state.planner.food_index(state)
+    radius = 0
+    while len(index.near(cell, radius)) < count and radius < index.span():
+        radius += 1
+    grid = state.grid
+    pos = grid.pos(cell)
+    size = state.grid_size
+    return nsmallest(
+        count,
+        index.near(cell, radius + 1),
+        key=lambda food_cell: toroidal_distance(pos, grid.pos(food_cell), size),
+    )
+
+
+def uncontested(state, snake, foods):
+    # The foods snake can reach first by toroidal distance, counting the
+    # player's distance in AI moves; all of them if every one is contested.
+    grid = state.grid
+    size = state.grid_size
+    pos = grid.pos(snake.head)
+    distances = [toroidal_distance(pos, grid.pos(cell), size) for cell in foods]
+    # Only AI heads within twice the farthest food's distance can beat it.
+    radius = 2 * max(distances, default=0) // PLANNER_BUCKET + 1
+    rivals = [(grid.pos(state.player_snake.head), state.ai_move_delay)]
+    for head in state.planner.head_index(state).near(snake.head, radius):
+        if head != snake.head:
+            rivals.append((grid.pos(head), 1))
+    kept = []
+    for food_cell, distance in zip(foods, distances):
+        food = grid.pos(food_cell)
+        if all(
+            toroidal_distance(rival, food, size) >= distance * speed
+            for rival, speed in rivals
+        ):
+            kept.append(food_cell)
+    return kept or foods
+
+
+def step_direction(grid, head, cell):
+    for direction, table in zip(DIRECTIONS, grid.adjacent):
+        if table[head] == cell:
+            return direction
+    return None
+
+
+def plan_ai_direction(state, snake, owner, growth):
+    # Follows a cached A* path to food while its next step is safe, planning
+    # a new one under the per-tick budget when there is none. Without a safe
+    # path it chases its own tail, and failing that falls back to the greedy
+    # choice.
+    planner = state.planner
+    grid = state.grid
+    idx = owner - 2
+    head = snake.head
+    vacated = snake.vacated(growth)
+    path = planner.paths[idx]
+    if path and path[0] not in grid.neighbors(head):
+        planner.drop(idx)
+    if path and planner.new_food:
+        pos = grid.pos(head)
+        for cell in planner.new_food:
+            if toroidal_distance(pos, grid.pos(cell), state.grid_size) < len(path):
+                planner.drop(idx)
+                break
+    if not path:
+        targets = nearest_foods(state, head, 2 * PLANNER_TARGETS)
+        targets = uncontested(state, snake, targets)[:PLANNER_TARGETS]
+        if targets:
+            found = planner.find_path(grid, head, targets, planner.share(), vacated)
+            if found:
+                # A path cut short by the budget has no food to wait for.
+                target = found[-1] if found[-1] in targets else -1
+                planner.set_path(idx, found, target)
+    if path:
+        cell = path[0]
+        safe = not grid.blocked(cell, snake, owner, growth)
+        if safe and not state.regions().will_be_trapped(snake, cell, growth):
+            planner.advance(idx)
+            return step_direction(grid, head, cell)
+        planner.drop(idx)
+
+    # --- Survival: Chase the Own Tail ---
+    if len(snake) > 1:
+        found = planner.find_path(
+            grid, head, (snake.tail,), planner.share(), vacated
+        )
+        if found and not grid.blocked(found[0], snake, owner, growth):
+            return step_direction(grid, head, found[0])
+    return choose_ai_direction(state, snake, owner, growth)
+
+
+# --- Lookahead Search ---
+
+
+class SearchState:
+    # The board reduced to what a lookahead needs: snake cells in deques
+    # (index 0 is the player, AI idx is idx + 1), occupancy counts, growths,
+    # scores and food. make() plays one tick and unmake() takes it back in
+    # O(moving snakes), keeping popped tails, growths and eaten food on an
+    # undo stack. Eaten food is not respawned, as that depends on the RNG.
+    __slots__ = (
+        "adjacent",
+        "counts",
+        "snakes",
+        "growths",
+        "scores",
+        "food_at",
+        "undo",
+        "nodes",
+        "version",
+    )
+
+    def __init__(self, state):
+        grid = state.grid
+        self.adjacent = grid.adjacent
+        self.counts = bytearray(grid.counts)
+        self.snakes = [deque(state.player_snake.cells)]
+        self.snakes += [deque(snake.cells) for snake in state.ai_snakes]
+        self.growths = [state.player_growth] + state.ai_growths
+        self.scores = [state.player_score] + state.ai_scores
+        self.food_at = dict(state.food_at)
+        self.undo = []
+        self.nodes = 0  # Ticks played by make().
+        self.version = grid.version
+
+    def heading(self, idx):
+        # Index in DIRECTIONS of snake idx's last move, or 0 for one cell.
+        cells = self.snakes[idx]
+        if len(cells) > 1:
+            for move, table in enumerate(self.adjacent):
+                if table[cells[1]] == cells[0]:
+                    return move
+        return 0
+
+    def make(self, moves):
+        # Plays one tick of moves, [(snake index, index in DIRECTIONS)].
+        # Returns the indices of the snakes that crashed: into a cell still
+        # taken after the tick's tails move, or onto another moving head.
+        adjacent = self.adjacent
+        counts = self.counts
+        snakes = self.snakes
+        growths = self.growths
+        heads = []
+        vacated = {}
+        for idx, move in moves:
+            cells = snakes[idx]
+            heads.append(adjacent[move][cells[0]])
+            if growths[idx] == 0:
+                vacated[cells[-1]] = vacated.get(cells[-1], 0) + 1
+        crashed = []
+        for (idx, _), head in zip(moves, heads):
+            if counts[head] > vacated.get(head, 0) or heads.count(head) > 1:
+                crashed.append(idx)
+
+        record = []
+        food_at = self.food_at
+        for (idx, _), head in zip(moves, heads):
+            cells = snakes[idx]
+            growth = growths[idx]
+            score = self.scores[idx]
+            cells.appendleft(head)
+            counts[head] += 1
+            food = food_at.pop(head, None)
+            tail = -1
+            if food is not None:
+                gain, extra = food_reward(food)
+                self.scores[idx] += gain
+                growths[idx] += extra
+            elif growth > 0:
+                growths[idx] -= 1
+            else:
+                tail = cells.pop()
+                counts[tail] -= 1
+            record.append((idx, tail, growth, score, food))
+        self.undo.append(record)
+        self.nodes += 1
+        return crashed
+
+    def unmake(self):
+        snakes = self.snakes
+        counts = self.counts
+        for idx, tail, growth, score, food in reversed(self.undo.pop()):
+            cells = snakes[idx]
+            if tail >= 0:
+                cells.append(tail)
+                counts[tail] += 1
+            head = cells.popleft()
+            counts[head] -= 1
+            if food is not None:
+                self.food_at[head] = food
+            self.growths[idx] = growth
+            self.scores[idx] = score
+
+    def space(self, cell, limit):
+        # Free cells reachable from cell, counting up to limit.
+        adjacent = self.adjacent
+        counts = self.counts
+        seen = {cell}
+        frontier = [cell]
+        while frontier and len(seen) <= limit:
+            next_frontier = []
+            for current in frontier:
+                for table in adjacent:
+                    neighbor = table[current]
+                    if neighbor not in seen and counts[neighbor] == 0:
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return len(seen) - 1
+
+
+class SearchBudgetSpent(Exception):
+    pass
+
+
+def search_ai_direction(state, snake, owner, growth):
+    # Alpha-beta over this snake's next moves. When the player is close
+    # enough to matter, it answers the first move with its worst reply and
+    # then keeps its heading; AI snakes nearby keep theirs and the rest of
+    # the board stands still. Deepens one move at a time while its share of
+    # SEARCH_BUDGET lasts, and plays the best move of the deepest finished
+    # search. Positions score food eaten, distance to food and room to move.
+    grid = state.grid
+    head = snake.head
+    roots = [
+        move
+        for move in range(len(DIRECTIONS))
+        if not grid.blocked(grid.adjacent[move][head], snake, owner, growth)
+    ]
+    regions = state.regions()
+    roots = [
+        move
+        for move in roots
+        if not regions.will_be_trapped(snake, grid.adjacent[move][head], growth)
+    ] or roots
+    if len(roots) < 2:
+        return DIRECTIONS[roots[0]] if roots else None
+
+    board = state.search_board()
+    distances = state.distances()
+    me = owner - 1
+    delay = state.ai_move_delay
+    size = state.grid_size
+    here = grid.pos(head)
+    reach = SEARCH_DEPTH * (1 + delay) + 1
+    player = toroidal_distance(here, grid.pos(state.player_snake.head), size)
+    player = player <= reach
+    others = [
+        (idx + 1, board.heading(idx + 1))
+        for idx, other in enumerate(state.ai_snakes)
+        if idx + 1 != me
+        and toroidal_distance(here, grid.pos(other.head), size) <= 2 * SEARCH_DEPTH
+    ]
+    start_scores = list(board.scores)
+    space = min(len(snake), SEARCH_SPACE)
+    far = state.grid_width + state.grid_height
+    limit = max(SEARCH_MIN_NODES, SEARCH_BUDGET // len(state.ai_snakes))
+    limit += board.nodes
+
+    def evaluate():
+        scores = board.scores
+        cell = board.snakes[me][0]
+        distance = distances.distance(cell)
+        value = 100 * (scores[me] - start_scores[me])
+        value -= 100 * (scores[0] - start_scores[0])
+        if scores[me] == start_scores[me]:
+            # The distances are to the food before the search ate any.
+            value -= far if distance == -1 else distance
+        return value - 20 * max(0, space - board.space(cell, space))
+
+    def options(idx, last):
+        if len(board.snakes[idx]) == 1:
+            return range(len(DIRECTIONS))
+        return [move for move in range(len(DIRECTIONS)) if move != last ^ 1]
+
+    def play(move, reply, depth, alpha, beta, plies):
+        # One AI move and the ticks until the next one, then the search below.
+        score = board.scores[me]
+        made = 0
+        crashed = ()
+        for tick in range(delay):
+            moves = [(0, reply)] if player else []
+            if tick == 0:
+                moves.append((me, move))
+                moves += others
+            if not moves:
+                continue
+            if board.nodes >= limit:
+                raise SearchBudgetSpent
+            crashed = board.make(moves)
+            made += 1
+            if me in crashed or 0 in crashed:
+                break
+        if me in crashed:
+            value = plies - SEARCH_DECIDED
+        elif 0 in crashed:
+            value = SEARCH_DECIDED - plies
+        elif depth == 1:
+            value = evaluate()
+        else:
+            value = best_move(move, reply, depth - 1, alpha, beta, plies + 1)[1]
+        if board.scores[me] > score and me not in crashed:
+            value += depth  # Sooner is better than later.
+        for _ in range(made):
+            board.unmake()
+        return value
+
+    def best_move(last, reply_last, depth, alpha, beta, plies, moves=None):
+        # (move, value) of the best move for this AI against its worst reply.
+        best = (None, -math.inf)
+        for move in moves or options(me, last):
+            value = math.inf
+            low = max(alpha, best[1])
+            if not player:
+                replies = (None,)
+            elif plies == 1:
+                replies = options(0, reply_last)
+            else:
+                replies = (reply_last,)  # Keeps its heading after one reply.
+            for reply in replies:
+                high = min(beta, value)
+                value = min(value, play(move, reply, depth, low, high, plies))
+                if value <= low:
+                    break
+            if value > best[1]:
+                best = (move, value)
+            if best[1] >= beta:
+                break
+        return best
+
+    choice = roots[0]
+    # The heading its body shows, not player_direction: that holds keys
+    # pressed since the last tick, which a snapshot taken for the worker
+    # has not seen.
+    player_last = board.heading(0)
+    try:
+        for depth in range(1, SEARCH_DEPTH + 1):
+            move, _ = best_move(
+                None, player_last, depth, -math.inf, math.inf, 1, roots
+            )
+            choice = move
+    except SearchBudgetSpent:
+        while board.undo:
+            board.unmake()
+    return DIRECTIONS[choice]
+
+
+AI_KINDS = {
+    "greedy": choose_ai_direction,
+    "planner": plan_ai_direction,
+    "search": search_ai_direction,
+}
+
+
+# --- Game State ---
+
+
+class GameState:
+    def __init__(
+        self,
+        grid_width,
+        grid_height,
+        num_ai=1,
+        win_score=15,
+        seed=None,
+        food_count=None,
+        ai_move_delay=AI_MOVE_DELAY,
+        ai_kind="greedy",
+    ):
+        if food_count is None:
+            food_count = arena_food_count(num_ai)
+        if ai_kind not in AI_KINDS:
+            raise ValueError(f"unknown AI kind {ai_kind!r}")
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.grid_size = (grid_width, grid_height)
+        self.win_score = win_score
+        self.food_count = food_count
+        self.ai_move_delay = ai_move_delay
+        self.ai_kind = ai_kind
+        self.choose_ai_direction = AI_KINDS[ai_kind]
+        if seed is None:
+            seed = random.getrandbits(64)  # Kept so the game can be replayed.
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        # Player snake:
+        self.player_snake = SnakeBody(
+            [(3 * grid_width // 4, grid_height // 2)], grid_width
+        )
+        self.player_direction = (1, 0)
+        self.player_growth = 0
+        self.player_score = 0
+
+        # AI snakes:
+        self.ai_snakes = [
+            SnakeBody([pos], grid_width)
+            for pos in ai_start_positions(num_ai, grid_width, grid_height)
+        ]
+        self.ai_growths = [0] * len(self.ai_snakes)
+        self.ai_scores = [0] * len(self.ai_snakes)
+        self.planner = None
+        if ai_kind == "planner":
+            self.planner = PathPlanner(len(self.ai_snakes))
+
+        # Occupancy of every snake segment:
+        self.grid = OccupancyGrid(grid_width, grid_height)
+        self.grid.add(self.player_snake.head, PLAYER_ID)
+        for idx, snake in enumerate(self.ai_snakes):
+            self.grid.add(snake.head, idx + 2)
+
+        # Cells free for food:
+        self.free_cells = FreeCells(grid_width * grid_height)
+        self.free_cells.discard(self.player_snake.head)
+        for snake in self.ai_snakes:
+            self.free_cells.discard(snake.head)
+
+        self.dirty = set()  # Cells changed since the renderer last drew.
+        self._regions = None
+        self._distances = None
+        self._field_changes = []  # Cells changed since _distances was repaired.
+        self._search = None
+
+        # Food:
+        self.foods = []
+        self.food_at = {}  # cell index -> food
+        self.missing_food = 0  # Foods owed while the board was full.
+        for _ in range(food_count):
+            self._spawn_food()
+
+        self.profiler = None  # A snake_profile.Profiler while profiling.
+        self.ai_move_counter = 0
+        self.tick = 0
+        self.fallback_ticks = []  # AI ticks played with fallback_directions().
+        self.game_over = False
+        self.winner = None
+
+    @property
+    def current_fps(self):
+        total_food = self.player_score + sum(self.ai_scores)
+        return BASE_FPS + ((total_food // 5) * FPS_INCREMENT)
+
+    def set_player_direction(self, new_dir):
+        # Ignores a direct reversal unless the snake is a single cell.
+        if len(self.player_snake) == 1 or new_dir != (
+            -self.player_direction[0],
+            -self.player_direction[1],
+        ):
+            self.player_direction = new_dir
+
+    def is_ai_tick(self):
+        # Whether the AI snakes move on the next step().
+        return self.ai_move_counter + 1 >= self.ai_move_delay
+
+    def ai_directions(self):
+        # Direction of every AI snake on an AI tick, None for a snake with no
+        # safe move. Reads the board as it is before the tick.
+        return [
+            self.choose_ai_direction(self, snake, idx + 2, self.ai_growths[idx])
+            for idx, snake in enumerate(self.ai_snakes)
+        ]
+
+    def decide_ai(self):
+        # ai_directions() with the RNG, planner and food distances it leaves
+        # behind, which step() adopts when given this as ai_decision, and the
+        # seconds and ai_work() it took, which step() profiles.
+        start = time.perf_counter()
+        directions = self.ai_directions()
+        cost = (time.perf_counter() - start, self.ai_work())
+        return directions, self.rng.getstate(), self.planner, self._distances, cost
+
+    def ai_work(self):
+        # (name, count) of the board cells visited by the last AI tick's trap
+        # checks and food distances and the nodes its planner and searches
+        # expanded, for the profiler.
+        work = []
+        if self._regions is not None:
+            work.append(("region bfs", len(self._regions.labels)))
+        if self._distances is not None:
+            work.append(("food bfs", self._distances.visited))
+        if self.planner:
+            work.append(("planner a*", self.planner.expanded))
+        if self._search is not None:
+            work.append(("search", self._search.nodes))
+        return work
+
+    def fallback_directions(self):
+        # Cheap stand-in for ai_directions(): the first direction whose cell
+        # is not blocked, without trap checks, food search or the RNG.
+        grid = self.grid
+        directions = []
+        for idx, snake in enumerate(self.ai_snakes):
+            for direction in DIRECTIONS:
+                cell = grid.neighbor(snake.head, direction)
+                if not grid.blocked(cell, snake, idx + 2, self.ai_growths[idx]):
+                    directions.append(direction)
+                    break
+            else:
+                directions.append(None)
+        return directions
+
+    def snapshot(self):
+        # Copy of everything decide_ai() reads or changes, so AI moves can be
+        # decided on another thread or process while this state is drawn.
+        view = GameState.__new__(GameState)
+        view.__dict__.update(self.__dict__)
+        view.grid = self.grid.copy()
+        view.player_snake = self.player_snake.copy()
+        view.ai_snakes = [snake.copy() for snake in self.ai_snakes]
+        view.ai_growths = list(self.ai_growths)
+        view.ai_scores = list(self.ai_scores)
+        view.food_at = dict(self.food_at)
+        view.rng = random.Random()
+        view.rng.setstate(self.rng.getstate())
+        view.planner = copy.deepcopy(self.planner)
+        if self._distances is not None:
+            view._distances = self._distances.copy()
+            view._field_changes = list(self._field_changes)
+        # Not read when deciding moves; dropped so a process pool pickles less.
+        view.foods = view.free_cells = view.dirty = view.fallback_ticks = None
+        view.profiler = view._regions = view._search = None
+        return view
+
+    def regions(self):
+        # Region analysis of the current board, rebuilt only after it changes.
+        if self._regions is None or self._regions.version != self.grid.version:
+            longest = len(self.player_snake)
+            for snake in self.ai_snakes:
+                longest = max(longest, len(snake))
+            self._regions = RegionMap(self.grid, longest + 13)
+        return self._regions
+
+    def distances(self):
+        # Food distance field of the current board. Built once, then repaired
+        # around the cells snakes and food changed since, so an AI tick costs
+        # the few cells a move can affect rather than a search of the board.
+        if self._distances is None:
+            self._distances = DistanceField(self.grid, self.food_at)
+            self._field_changes = []
+        elif self._field_changes:
+            self._distances.update(self.grid, self._field_changes, self.food_at)
+            self._field_changes = []
+        return self._distances
+
+    def search_board(self):
+        # SearchState of the current board, shared by the search AIs of an AI
+        # tick, each of which leaves it as it found it.
+        if self._search is None or self._search.version != self.grid.version:
+            self._search = SearchState(self)
+        return self._search
+
+    def _push_head(self, snake, owner, head):
+        self.dirty.add(snake.head)  # Old head is redrawn as body.
+        self.dirty.add(head)
+        snake.push_head(head)
+        self.grid.add(head, owner)
+        self.free_cells.discard(head)
+        if self._distances is not None:
+            self._field_changes.append(head)
+        if self.planner:
+            self.planner.blocked(head)
+
+    def _pop_tail(self, snake):
+        tail = snake.pop_tail()
+        self.dirty.add(tail)
+        self.grid.remove(tail)
+        if self.grid.counts[tail] == 0:
+            self.free_cells.add(tail)
+        if self._distances is not None:
+            self._field_changes.append(tail)
+
+    def _spawn_food(self):
+        # Places a food on a random free cell. On a full board the food is
+        # owed instead and placed by _refill_food() once a cell frees up.
+        cell = self.free_cells.sample(self.rng)
+        if cell is None:
+            self.missing_food += 1
+            return
+        food = make_food(self.grid.pos(cell), self.rng)
+        self.free_cells.discard(cell)
+        self.dirty.add(cell)
+        self.food_at[cell] = food
+        self.foods.append(food)
+        if self.planner:
+            self.planner.new_food.append(cell)
+            self.planner.foods = None
+        if self._distances is not None:
+            self._field_changes.append(cell)
+
+    def _refill_food(self):
+        missing = self.missing_food
+        self.missing_food = 0
+        for _ in range(missing):
+            self._spawn_food()
+
+    def _eat_at(self, head):
+        # Removes and replaces the food at head; returns it, or None.
+        food = self.food_at.pop(head, None)
+        if food is not None:
+            if self.planner:
+                self.planner.food_eaten(head)
+            self.foods.remove(food)
+            self._spawn_food()
+        return food
+
+    def step(self, player_direction=None, ai_decision=None, ai_fallback=False):
+        # Advances the game by one tick. Returns True once the game is over.
+        # On an AI tick the AI snakes follow ai_decision when given (from
+        # decide_ai() on a snapshot taken after the last tick), or
+        # fallback_directions() with ai_fallback, which is noted in
+        # fallback_ticks for replays.
+        if self.game_over:
+            return True
+        if player_direction is not None:
+            self.set_player_direction(player_direction)
+        profiler = self.profiler
+        if profiler:
+            mark = time.perf_counter()
+        player_snake = self.player_snake
+        ai_snakes = self.ai_snakes
+        ai_growths = self.ai_growths
+        grid = self.grid
+
+        # --- Compute New Head for Player ---
+        new_player_head = grid.neighbor(player_snake.head, self.player_direction)
+
+        # --- Update AI Snakes (every ai_move_delay ticks) ---
+        self.ai_move_counter += 1
+        new_ai_heads = []
+        ai_cost = None  # Seconds and work of a decision made on a snapshot.
+        ai_moved = self.ai_move_counter >= self.ai_move_delay
+        if ai_moved:
+            self.ai_move_counter = 0
+            if ai_fallback:
+                self.fallback_ticks.append(self.tick)
+                ai_directions = self.fallback_directions()
+            elif ai_decision is not None:
+                ai_directions, rng_state, self.planner, distances, ai_cost = (
+                    ai_decision
+                )
+                self.rng.setstate(rng_state)
+                if distances is not None:
+                    # Repaired up to this board on the worker; the changes it
+                    # covered need no repair here.
+                    self._distances = distances
+                    self._field_changes = []
+            else:
+                ai_directions = self.ai_directions()
+            for snake, ai_direction in zip(ai_snakes, ai_directions):
+                if ai_direction is not None:
+                    new_ai_heads.append(grid.neighbor(snake.head, ai_direction))
+                else:
+                    new_ai_heads.append(snake.head)
+        else:
+            for snake in ai_snakes:
+                new_ai_heads.append(snake.head)
+        if profiler:
+            now = time.perf_counter()
+            if ai_cost is None:
+                profiler.add("ai", now - mark)
+                # Fallback moves search nothing.
+                ai_work = self.ai_work() if ai_moved and not ai_fallback else []
+            else:
+                # The snapshot's own time and work: this state's caches were
+                # not used for the decision.
+                profiler.add("ai", ai_cost[0])
+                ai_work = ai_cost[1]
+            mark = now
+            for name, value in ai_work:
+                profiler.count(name, value)
+            if ai_moved and self._distances is not None:
+                self._distances.visited = 0
+        if ai_moved:
+            self._search = None
+        if ai_moved and self.planner:
+            self.planner.expanded = 0
+            self.planner.new_food.clear()
+            self.planner.heads = None
+
+        # --- Collision Checks ---
+        game_over = False
+        winner = None
+        for head in new_ai_heads:
+            if new_player_head == head:
+                winner = "It is a Tie"
+                game_over = True
+                break
+
+        if not game_over:
+            if grid.collides_self(
+                player_snake, PLAYER_ID, new_player_head, self.player_growth
+            ):
+                winner = "AI"
+                game_over = True
+            else:
+                for idx, snake in enumerate(ai_snakes):
+                    if grid.collides_other(
+                        new_player_head, snake, idx + 2, ai_growths[idx]
+                    ):
+                        winner = "AI"
+                        game_over = True
+                        break
+
+        if ai_moved and not game_over:
+            for idx, snake in enumerate(ai_snakes):
+                if grid.collides_self(
+                    snake, idx + 2, new_ai_heads[idx], ai_growths[idx]
+                ):
+                    winner = "Player"
+                    game_over = True
+                    break
+            if not game_over:
+                for head in new_ai_heads:
+                    if grid.owned(head, PLAYER_ID, player_snake):
+                        winner = "Player"
+                        game_over = True
+                        break
+
+        if profiler:
+            now = time.perf_counter()
+            profiler.add("collisions", now - mark)
+            mark = now
+
+        # --- Update Positions & Process Food ---
+        if not game_over:
+            self._push_head(player_snake, PLAYER_ID, new_player_head)
+            eaten_food = self._eat_at(new_player_head)
+            if eaten_food:
+                score, growth = food_reward(eaten_food)
+                self.player_score += score
+                self.player_growth += growth
+            elif self.player_growth > 0:
+                self.player_growth -= 1
+            else:
+                self._pop_tail(player_snake)
+
+            if ai_moved:
+                for idx in range(len(ai_snakes)):
+                    self._push_head(ai_snakes[idx], idx + 2, new_ai_heads[idx])
+                    eaten_food = self._eat_at(new_ai_heads[idx])
+                    if eaten_food:
+                        score, growth = food_reward(eaten_food)
+                        self.ai_scores[idx] += score
+                        ai_growths[idx] += growth
+                    elif ai_growths[idx] > 0:
+                        ai_growths[idx] -= 1
+                    else:
+                        self._pop_tail(ai_snakes[idx])
+
+            if self.missing_food:
+                self._refill_food()
+
+        # --- Check Winning Condition (Individual Scores) ---
+        if self.player_score >= self.win_score:
+            game_over = True
+            winner = "Player"
+        else:
+            for idx, score in enumerate(self.ai_scores):
+                if score >= self.win_score:
+                    game_over = True
+                    winner = f"AI Snake {idx+1}"
+                    break
+
+        if profiler:
+            profiler.add("food", time.perf_counter() - mark)
+
+        self.tick += 1
+        self.game_over = game_over
+        self.winner = winner
+        return game_over
+
+
+# --- Headless Play ---
+
+
+def player_autopilot(state):
+    # Drives the player with the same greedy AI, treating every AI snake as an
+    # obstacle. Used for headless matches with no human at the keyboard.
+    return choose_ai_direction(
+        state, state.player_snake, PLAYER_ID, state.player_growth
+    )
+
+
+def run_headless(state, controller=player_autopilot, max_ticks=100000):
+    # Runs a game to completion without rendering. Returns (ticks, seconds).
+    start = time.perf_counter()
+    start_tick = state.tick
+    while not state.game_over and state.tick - start_tick < max_ticks:
+        state.step(controller(state))
+    return state.tick - start_tick, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Snake simulation.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    parser.add_argument(
+        "--ai", type=int, help="number of AI snakes, overriding --difficulty"
+    )
+    parser.add_argument("--win-score", type=int, help="overrides --difficulty")
+    parser.add_argument(
+        "--food", type=int, help="foods on the board (default scales with --ai)"
+    )
+    parser.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    parser.add_argument(
+        "--profile", action="store_true", help="print per-phase step timings"
+    )
+    args = parser.parse_args()
+
+    profiler = None
+    if args.profile:
+        from snake_profile import Profiler
+
+        profiler = Profiler()
+    win_score, num_ai = DIFFICULTY_PRESETS[args.difficulty]
+    if args.ai is not None:
+        num_ai = args.ai
+    if args.win_score is not None:
+        win_score = args.win_score
+    total_ticks = 0
+    total_time = 0.0
+    winners = {}
+    for game in range(args.games):
+        state = GameState(
+            args.width,
+            args.height,
+            num_ai,
+            win_score,
+            seed=args.seed + game,
+            food_count=args.food,
+            ai_kind=args.ai_kind,
+        )
+        state.profiler = profiler
+        ticks, elapsed = run_headless(state, max_ticks=args.max_ticks)
+        total_ticks += ticks
+        total_time += elapsed
+        winners[state.winner] = winners.get(state.winner, 0) + 1
+    print(f"Games: {args.games}  Ticks: {total_ticks}  Time: {total_time:.3f}s")
+    print(f"Ticks per second: {total_ticks / total_time if total_time else 0:.0f}")
+    for winner, count in sorted(winners.items(), key=lambda kv: -kv[1]):
+        print(f"  {winner}: {count}")
+    if profiler:
+        print("\n".join(profiler.lines()))
+
+
+if __name__ == "__main__":
+    main()
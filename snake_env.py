@@ -0,0 +1,226 @@
+import argparse
+import time
+
+import numpy as np
+
+from snake_engine import (
+    AI_KINDS,
+    DIFFICULTY_PRESETS,
+    DIRECTIONS,
+    MIXED_OWNER,
+    PLAYER_ID,
+    GameState,
+)
+
+# Gym-style environment for training agents that steer the player snake
+# against the built-in AI. VectorEnv plays N games under GameState's rules;
+# reset() and step() return views of arrays allocated once, and each step
+# rewrites only the observation cells listed in state.dirty, the same
+# cells the renderer would repaint.
+#
+# Observations are uint8 arrays of shape (N, CHANNELS, height, width): the
+# player's body, every AI body, and one channel per food type. Body cells
+# are 1 and heads HEAD. Actions index DIRECTIONS; reversing into the body is
+# ignored like the arrow keys. Rewards are the points of the food the
+# player ate (NORMAL_FOOD_VALUE, GOLD_FOOD_VALUE), plus the win score for a
+# win and minus it for a loss. An env whose game ended starts a new one on
+# the next step, which ignores its action and returns the first observation
+# of the new game with a reward of 0.
+
+OWN_BODY = 0
+OTHER_BODIES = 1
+RED_FOOD = 2
+YELLOW_FOOD = 3
+GOLD_FOOD = 4
+CHANNELS = 5
+FOOD_CHANNELS = {"red": RED_FOOD, "yellow": YELLOW_FOOD, "gold": GOLD_FOOD}
+HEAD = 2  # Body channel value of a head cell; other segments are 1.
+
+
+def outcome_reward(state):
+    # Reward for how a finished game ended, in points of food.
+    if state.winner == "Player":
+        return state.win_score
+    if state.winner is None or state.winner == "It is a Tie":
+        return 0
+    return -state.win_score  # "AI" (player crashed) or an AI reached the score.
+
+
+class VectorEnv:
+    def __init__(
+        self,
+        num_envs,
+        grid_width,
+        grid_height,
+        num_ai=1,
+        win_score=15,
+        seed=0,
+        food_count=None,
+        ai_kind="greedy",
+        max_ticks=100000,
+    ):
+        self.num_envs = num_envs
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_ai = num_ai
+        self.win_score = win_score
+        self.food_count = food_count
+        self.ai_kind = ai_kind
+        self.max_ticks = max_ticks
+        self.observations = np.zeros(
+            (num_envs, CHANNELS, grid_height, grid_width), dtype=np.uint8
+        )
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.states = [None] * num_envs
+        self.winners = [None] * num_envs  # Of each env's last finished game.
+        self.seed = seed
+        self.games = 0  # Games started; game k is seeded seed + k.
+
+    def reset(self, seed=None):
+        # Starts a new game in every env. Returns the observations.
+        if seed is not None:
+            self.seed = seed
+        self.games = 0
+        self.rewards[:] = 0
+        self.dones[:] = False
+        for i in range(self.num_envs):
+            self.new_game(i)
+        return self.observations
+
+    def step(self, actions):
+        # Applies one action per env. Returns (observations, rewards, dones);
+        # the arrays are overwritten by the next call. winners has the result
+        # of every game that ended.
+        observations = self.observations
+        rewards = self.rewards
+        dones = self.dones
+        for i, state in enumerate(self.states):
+            if dones[i]:
+                self.new_game(i)
+                rewards[i] = 0
+                continue
+            score = state.player_score
+            state.step(DIRECTIONS[actions[i]])
+            reward = state.player_score - score
+            if state.tick >= self.max_ticks and not state.game_over:
+                state.game_over = True
+            if state.game_over:
+                reward += outcome_reward(state)
+                self.winners[i] = state.winner
+            rewards[i] = reward
+            dones[i] = state.game_over
+            self.update(state, observations[i])
+        return observations, rewards, dones
+
+    def new_game(self, i):
+        state = GameState(
+            self.grid_width,
+            self.grid_height,
+            self.num_ai,
+            self.win_score,
+            seed=self.seed + self.games,
+            food_count=self.food_count,
+            ai_kind=self.ai_kind,
+        )
+        self.games += 1
+        self.states[i] = state
+        self.dones[i] = False
+        observation = self.observations[i]
+        observation.fill(0)
+        state.dirty.clear()
+        state.dirty.update(state.player_snake.cells)
+        for snake in state.ai_snakes:
+            state.dirty.update(snake.cells)
+        state.dirty.update(state.food_at)
+        self.update(state, observation)
+
+    def update(self, state, observation):
+        # Rewrites the cells the last tick changed, then marks the heads.
+        grid = state.grid
+        counts = grid.counts
+        owners = grid.owners
+        width = self.grid_width
+        player_snake = state.player_snake
+        food_at = state.food_at
+        for cell in state.dirty:
+            y, x = divmod(cell, width)
+            count = counts[cell]
+            owner = owners[cell]
+            if count == 0:
+                own = other = 0
+            elif owner == MIXED_OWNER:
+                own = grid.owned(cell, PLAYER_ID, player_snake)
+                other = count - own
+            else:
+                own = owner == PLAYER_ID
+                other = not own
+            observation[OWN_BODY, y, x] = own > 0
+            observation[OTHER_BODIES, y, x] = other > 0
+            observation[RED_FOOD:, y, x] = 0
+            food = food_at.get(cell)
+            if food is not None:
+                observation[FOOD_CHANNELS[food[2]], y, x] = 1
+        state.dirty.clear()
+        y, x = divmod(player_snake.head, width)
+        observation[OWN_BODY, y, x] = HEAD
+        for snake in state.ai_snakes:
+            y, x = divmod(snake.head, width)
+            observation[OTHER_BODIES, y, x] = HEAD
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Step random agents through vectorized Snake games."
+    )
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    parser.add_argument(
+        "--ai", type=int, help="number of AI snakes, overriding --difficulty"
+    )
+    parser.add_argument("--win-score", type=int, help="overrides --difficulty")
+    parser.add_argument(
+        "--food", type=int, help="foods on the board (default scales with --ai)"
+    )
+    parser.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    win_score, num_ai = DIFFICULTY_PRESETS[args.difficulty]
+    if args.ai is not None:
+        num_ai = args.ai
+    if args.win_score is not None:
+        win_score = args.win_score
+    env = VectorEnv(
+        args.envs,
+        args.width,
+        args.height,
+        num_ai,
+        win_score,
+        seed=args.seed,
+        food_count=args.food,
+        ai_kind=args.ai_kind,
+    )
+    rng = np.random.default_rng(args.seed)
+    actions = np.zeros(args.envs, dtype=np.int64)
+    env.reset()
+    episodes = 0
+    total_reward = 0.0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        actions[:] = rng.integers(0, len(DIRECTIONS), args.envs)
+        _, rewards, dones = env.step(actions)
+        episodes += int(dones.sum())
+        total_reward += float(rewards.sum())
+    elapsed = time.perf_counter() - start
+    env_steps = args.steps * args.envs
+    print(f"Env steps: {env_steps}  Episodes: {episodes}  Time: {elapsed:.3f}s")
+    print(f"Env steps per second: {env_steps / elapsed if elapsed else 0:.0f}")
+    print(f"Reward per episode: {total_reward / episodes if episodes else 0:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import math
+
+# Per-phase timing for --profile. Samples go into log-spaced histograms, so
+# recording costs one log2() and memory stays fixed however long a game runs.
+# Nothing here is called unless a Profiler is attached.
+
+BUCKETS_PER_OCTAVE = 8  # Bucket bounds about 9% apart.
+
+
+class Histogram:
+    def __init__(self, smallest):
+        self.smallest = smallest  # Upper bound of bucket 0.
+        self.buckets = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.smallest:
+            index = 0
+        else:
+            index = int(math.log2(value / self.smallest) * BUCKETS_PER_OCTAVE) + 1
+        buckets = self.buckets
+        if index >= len(buckets):
+            buckets.extend([0] * (index + 1 - len(buckets)))
+        buckets[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples.
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                bound = self.smallest * 2 ** (index / BUCKETS_PER_OCTAVE)
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Profiler:
+    # Phase latencies in seconds, plus counters such as BFS cells visited.
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+
+    def add(self, phase, seconds):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram(1e-7)
+        histogram.add(seconds)
+
+    def count(self, name, value):
+        histogram = self.counters.get(name)
+        if histogram is None:
+            histogram = self.counters[name] = Histogram(1)
+        histogram.add(value)
+
+    def summary(self):
+        return {
+            "phases": {name: h.summary() for name, h in self.phases.items()},
+            "counters": {name: h.summary() for name, h in self.counters.items()},
+        }
+
+    def lines(self):
+        # Short human-readable summary, one line per phase and counter.
+        lines = []
+        for name, histogram in self.phases.items():
+            s = histogram.summary()
+            lines.append(
+                f"{name:<11} p50 {s['p50'] * 1000:7.3f}  p95 {s['p95'] * 1000:7.3f}  "
+                f"p99 {s['p99'] * 1000:7.3f} ms  n={s['count']}"
+            )
+        for name, histogram in self.counters.items():
+            s = histogram.summary()
+            lines.append(
+                f"{name:<11} p50 {s['p50']:7.0f}  p95 {s['p95']:7.0f}  "
+                f"p99 {s['p99']:7.0f}     n={s['count']}"
+            )
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,367 @@
+from collections import OrderedDict
+
+import pygame
+
+from snake_engine import (
+    MIXED_OWNER,
+    NORMAL_FOOD_VALUE,
+    PLAYER_ID,
+    YELLOW_FOOD_VALUE,
+    compute_direction,
+)
+
+BACKGROUND = (0, 0, 0)
+PLAYER_HEAD_COLOR = (255, 255, 0)
+PLAYER_BODY_COLOR = (0, 255, 0)
+AI_HEAD_COLOR = (255, 0, 255)
+AI_BODY_COLOR = (0, 0, 255)
+TEXT_COLOR = (255, 255, 255)
+SCORE_POS = (10, 10)
+FONT_SIZE = 36
+TEXT_CACHE_SIZE = 64
+MAX_LISTED_AIS = 3  # Larger arenas show only the leading AI score.
+OVERLAY_REFRESH_MS = 500  # How often the profile overlay is re-rendered.
+
+
+def food_color(food):
+    if food[1] == NORMAL_FOOD_VALUE:
+        return (255, 0, 0)  # Red
+    elif food[1] == YELLOW_FOOD_VALUE:
+        return (255, 255, 0)  # Yellow
+    return (255, 215, 0)  # Gold
+
+
+def segment_color(owner, is_head):
+    if owner == PLAYER_ID:
+        return PLAYER_HEAD_COLOR if is_head else PLAYER_BODY_COLOR
+    return AI_HEAD_COLOR if is_head else AI_BODY_COLOR
+
+
+class TextCache:
+    # Rendered text surfaces keyed by (text, color), dropping the least
+    # recently used one once more than max_size are held.
+
+    def __init__(self, font=None, max_size=TEXT_CACHE_SIZE):
+        # Without a font, pygame's default font is loaded on the first
+        # render, so the window can open before any font file is read.
+        self.font = font
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, text, color=TEXT_COLOR):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if self.font is None:
+                self.font = pygame.font.Font(None, FONT_SIZE)
+            surface = self.font.render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+
+def cell_sprite(color, cell_size, target):
+    # In target's pixel format, which blits fastest onto it.
+    sprite = pygame.Surface((cell_size, cell_size), 0, target)
+    sprite.fill(color)
+    return sprite
+
+
+def food_sprite(color, cell_size, target):
+    sprite = cell_sprite(BACKGROUND, cell_size, target)
+    center = (cell_size // 2, cell_size // 2)
+    pygame.draw.circle(sprite, color, center, cell_size // 2)
+    return sprite
+
+
+class Renderer:
+    # Draws a GameState, repainting only the cells listed in state.dirty and
+    # the score line when it changes. A full redraw happens on the first
+    # frame of a round and after invalidate() (resize, expose, or anything
+    # else drawn over the board such as the game-over overlay). Cells are
+    # drawn as pre-rendered sprites with one Surface.blits call per frame.
+    #
+    # Between ticks, draw() takes alpha, the fraction of the next tick that
+    # has elapsed, and slides the heads and tails that moved on the last tick
+    # from their old cell into their new one.
+    #
+    # screen can also be an offscreen Surface, with offscreen=True so the
+    # display is never updated.
+
+    def __init__(self, screen, text_cache, cell_size, offscreen=False):
+        self.screen = screen
+        self.text_cache = text_cache
+        self.cell_size = cell_size
+        self.offscreen = offscreen
+        self.cell_sprites = {
+            color: cell_sprite(color, cell_size, screen)
+            for color in (
+                BACKGROUND,
+                PLAYER_HEAD_COLOR,
+                PLAYER_BODY_COLOR,
+                AI_HEAD_COLOR,
+                AI_BODY_COLOR,
+            )
+        }
+        self.food_sprites = {}
+        self.state = None
+        self.score_key = None
+        self.score_surface = None
+        self.score_rect = None
+        self.tick = None
+        self.ends = []  # (head, tail) of every snake at self.tick
+        self.motion = []
+
+    def invalidate(self):
+        self.state = None
+
+    def repaint(self, rect):
+        # Repaints the cells under rect on the next frame.
+        if self.state is not None:
+            self.state.dirty.update(self.cells_under(rect))
+
+    def snakes(self, state):
+        snakes = [(idx + 2, snake) for idx, snake in enumerate(state.ai_snakes)]
+        snakes.append((PLAYER_ID, state.player_snake))
+        return snakes
+
+    def food_sprite(self, food):
+        color = food_color(food)
+        sprite = self.food_sprites.get(color)
+        if sprite is None:
+            sprite = self.food_sprites[color] = food_sprite(
+                color, self.cell_size, self.screen
+            )
+        return sprite
+
+    def score_text(self, state, win_score):
+        # Score line surface, re-rendered only when a score changes.
+        key = (state.player_score, tuple(state.ai_scores), win_score)
+        if key != self.score_key:
+            scores = state.ai_scores
+            if len(scores) > MAX_LISTED_AIS:
+                best = max(range(len(scores)), key=scores.__getitem__)
+                ai_total = f"{len(scores)} AIs, best AI{best+1}: {scores[best]}"
+            else:
+                ai_total = "  ".join(
+                    [f"AI{idx+1}: {score}" for idx, score in enumerate(scores)]
+                )
+            self.score_surface = self.text_cache.render(
+                f"Player: {state.player_score}  {ai_total}  (Win Score: {win_score})"
+            )
+            self.score_key = key
+        return self.score_surface
+
+    def draw(self, state, win_score, alpha=1.0):
+        if self.state is not state:
+            self.full_redraw(state, win_score)
+            self.motion = []
+        else:
+            if state.tick != self.tick:
+                # Repaint where the last motion was drawn part way.
+                for move in self.motion:
+                    state.dirty.update(cell for cell in move[1:] if cell >= 0)
+                self.motion = self.find_motion(state)
+            self.redraw_dirty(state, win_score, alpha)
+        state.dirty.clear()
+        self.tick = state.tick
+        self.ends = [(snake.head, snake.tail) for _, snake in self.snakes(state)]
+
+    # --- Full Redraw ---
+
+    def full_redraw(self, state, win_score):
+        screen = self.screen
+        cell_size = self.cell_size
+        screen.fill(BACKGROUND)
+        blits = []
+        for food in state.foods:
+            pos = (food[0][0] * cell_size, food[0][1] * cell_size)
+            blits.append((self.food_sprite(food), pos))
+        for owner, snake in self.snakes(state):
+            if snake:
+                head = self.cell_sprites[segment_color(owner, True)]
+                body = self.cell_sprites[segment_color(owner, False)]
+                for i, segment in enumerate(snake):
+                    pos = (segment[0] * cell_size, segment[1] * cell_size)
+                    blits.append((body if i else head, pos))
+        screen.blits(blits, doreturn=False)
+        self.score_rect = screen.blit(self.score_text(state, win_score), SCORE_POS)
+        if not self.offscreen:
+            pygame.display.update()
+        self.state = state
+
+    # --- Dirty Cells ---
+
+    def cell_color(self, state, cell):
+        # Color the full redraw leaves on a cell: the snake drawn last over
+        # it (player after AIs, body after head), else None.
+        grid = state.grid
+        count = grid.counts[cell]
+        if count == 0:
+            return None
+        owner = grid.owners[cell]
+        if owner != MIXED_OWNER:
+            if owner == PLAYER_ID:
+                snake = state.player_snake
+            else:
+                snake = state.ai_snakes[owner - 2]
+            return segment_color(owner, snake.head == cell and count == 1)
+        snakes = [(PLAYER_ID, state.player_snake)]
+        snakes += reversed(
+            [(idx + 2, snake) for idx, snake in enumerate(state.ai_snakes)]
+        )
+        for owner, snake in snakes:
+            segments = snake.cells.count(cell)
+            if segments:
+                return segment_color(owner, snake.head == cell and segments == 1)
+        return None
+
+    def find_motion(self, state):
+        # (owner, neck, head, old tail, new tail) of each snake that moved on
+        # the last tick, with -1 for an end that stayed put. Nothing is
+        # interpolated after more than one tick since the last frame.
+        if self.tick is None or state.tick != self.tick + 1:
+            return []
+        motion = []
+        for (owner, snake), (head, tail) in zip(self.snakes(state), self.ends):
+            neck = head if snake.head != head else -1
+            old_tail = tail if snake.tail != tail else -1
+            if neck >= 0 or old_tail >= 0:
+                new_head = snake.head if neck >= 0 else -1
+                new_tail = snake.tail if old_tail >= 0 else -1
+                motion.append((owner, neck, new_head, old_tail, new_tail))
+        return motion
+
+    def cell_rect(self, state, cell):
+        cell_size = self.cell_size
+        x = (cell % state.grid_width) * cell_size
+        y = (cell // state.grid_width) * cell_size
+        return pygame.Rect(x, y, cell_size, cell_size)
+
+    def slide(self, state, start, end, alpha):
+        # Parts of the start and end cells covered by a cell-sized square
+        # alpha of the way from start to end. Clipping to the two cells keeps
+        # this right when the move wraps around an edge.
+        grid = state.grid
+        dx, dy = compute_direction(grid.pos(start), grid.pos(end), state.grid_size)
+        offset = round(alpha * self.cell_size)
+        rest = self.cell_size - offset
+        start_rect = self.cell_rect(state, start)
+        end_rect = self.cell_rect(state, end)
+        return (
+            start_rect.move(dx * offset, dy * offset).clip(start_rect),
+            end_rect.move(-dx * rest, -dy * rest).clip(end_rect),
+        )
+
+    def cells_under(self, rect):
+        # Cell indices covered by a screen rect.
+        cell_size = self.cell_size
+        width = self.state.grid_width
+        height = self.state.grid_height
+        cells = []
+        bottom = min(height, (rect.bottom - 1) // cell_size + 1)
+        right = min(width, (rect.right - 1) // cell_size + 1)
+        for y in range(rect.top // cell_size, bottom):
+            for x in range(rect.left // cell_size, right):
+                cells.append(y * width + x)
+        return cells
+
+    def redraw_dirty(self, state, win_score, alpha=1.0):
+        cell_size = self.cell_size
+        width = state.grid_width
+        dirty = state.dirty
+        arriving = set()
+        for move in self.motion:
+            dirty.update(cell for cell in move[1:] if cell >= 0)
+            arriving.add(move[2])
+        score_key = self.score_key
+        text = self.score_text(state, win_score)
+        score_cells = self.cells_under(self.score_rect)
+        if self.score_key != score_key:
+            dirty.update(score_cells)
+            dirty.update(self.cells_under(text.get_rect(topleft=SCORE_POS)))
+        elif not dirty.isdisjoint(score_cells):
+            # Repaint the whole line so the text is not blended twice.
+            dirty.update(score_cells)
+        else:
+            text = None
+        if not dirty:
+            return
+
+        blits = []
+        for cell in dirty:
+            pos = ((cell % width) * cell_size, (cell // width) * cell_size)
+            color = self.cell_color(state, cell)
+            if cell in arriving and alpha < 1.0:
+                # The head slides in over what it left behind (eaten food).
+                blits.append((self.cell_sprites[BACKGROUND], pos))
+            elif color is not None:
+                blits.append((self.cell_sprites[color], pos))
+            elif cell in state.food_at:
+                blits.append((self.food_sprite(state.food_at[cell]), pos))
+            else:
+                blits.append((self.cell_sprites[BACKGROUND], pos))
+        rects = self.screen.blits(blits)
+        if alpha < 1.0:
+            # Tails first, so a one-cell snake shows its head.
+            screen = self.screen
+            for owner, neck, head, old_tail, new_tail in self.motion:
+                if old_tail >= 0:
+                    leaving, _ = self.slide(state, old_tail, new_tail, alpha)
+                    screen.fill(segment_color(owner, False), leaving)
+            for owner, neck, head, old_tail, new_tail in self.motion:
+                if neck >= 0:
+                    color = segment_color(owner, True)
+                    for rect in self.slide(state, neck, head, alpha):
+                        screen.fill(color, rect)
+        if text is not None:
+            self.score_rect = self.screen.blit(text, SCORE_POS)
+            rects.append(self.score_rect)
+        if not self.offscreen:
+            pygame.display.update(rects)
+
+
+class ProfileOverlay:
+    # Profiler summary in the bottom-left corner, drawn over the board every
+    # frame but only re-rendered every OVERLAY_REFRESH_MS.
+
+    def __init__(self, screen, font):
+        self.screen = screen
+        self.font = font
+        self.visible = True
+        self.surface = None
+        self.rect = None
+        self.rendered_at = None
+
+    def toggle(self, renderer):
+        self.visible = not self.visible
+        if not self.visible and self.rect:
+            renderer.repaint(self.rect)
+            self.rect = None
+
+    def draw(self, profiler, renderer):
+        if not self.visible:
+            return
+        now = pygame.time.get_ticks()
+        if self.rendered_at is None or now - self.rendered_at >= OVERLAY_REFRESH_MS:
+            lines = [
+                self.font.render(line, True, TEXT_COLOR, BACKGROUND)
+                for line in profiler.lines() or ["profiling..."]
+            ]
+            width = max(line.get_width() for line in lines)
+            height = sum(line.get_height() for line in lines)
+            self.surface = pygame.Surface((width, height)).convert()
+            self.surface.fill(BACKGROUND)
+            y = 0
+            for line in lines:
+                self.surface.blit(line, (0, y))
+                y += line.get_height()
+            self.rendered_at = now
+            if self.rect:
+                renderer.repaint(self.rect)
+        pos = (10, self.screen.get_height() - self.surface.get_height() - 10)
+        self.rect = self.screen.blit(self.surface, pos)
+        pygame.display.update(self.rect)
@@ -0,0 +1,528 @@
+import argparse
+import struct
+import zlib
+from bisect import bisect_right
+from collections import deque
+
+from snake_engine import (
+    AI_KINDS,
+    AI_MOVE_DELAY,
+    DIFFICULTY_PRESETS,
+    DIRECTIONS,
+    FOOD_COUNT,
+    PLAYER_ID,
+    FreeCells,
+    GameState,
+    OccupancyGrid,
+    PathPlanner,
+    player_autopilot,
+)
+
+# Compact binary replays. A replay stores the game config and seed, then only
+# the ticks where the player's direction changed, so playing it back through
+# GameState reproduces the match exactly. Snapshots of the full state every
+# KEYFRAME_INTERVAL ticks let state_at() seek without replaying from tick 0.
+#
+# Layout (little endian):
+#   header    HEADER (config, seed, final tick count, CRC32 of the final state,
+#             and from version 2 the AI kind)
+#   events    u32 byte length, then one varint per direction change:
+#             (ticks since the previous change << 2) | index in DIRECTIONS
+#   fallbacks from version 3, u32 byte length, then one varint per AI tick
+#             played with fallback_directions(): ticks since the previous one
+#   keyframes u32 count, then per keyframe u32 tick, u32 length and the
+#             zlib-compressed encode_state() bytes
+
+MAGIC = b"SNKR"
+VERSION = 3
+HEADERS = {
+    1: struct.Struct("<4sBHHHHQHBII"),
+    2: struct.Struct("<4sBHHHHQHBIIB"),  # Adds the index in AI_KINDS.
+    3: struct.Struct("<4sBHHHHQHBIIB"),  # Adds the fallbacks section.
+}
+HEADER = HEADERS[VERSION]
+KEYFRAME_INTERVAL = 500
+
+FOOD_KINDS = ["red", "yellow", "gold"]
+STATE_HEAD = struct.Struct("<IHBHBIIH")
+FOOD = struct.Struct("<IBB")
+RNG_HEAD = struct.Struct("<BBd")
+
+
+class ReplayError(Exception):
+    pass
+
+
+# --- Varints ---
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+# --- State Snapshots ---
+
+
+def pack_ints(fmt, values):
+    return struct.pack(f"<I{len(values)}{fmt}", len(values), *values)
+
+
+def unpack_ints(fmt, data, pos):
+    (count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    values = struct.unpack_from(f"<{count}{fmt}", data, pos)
+    return values, pos + count * struct.calcsize(fmt)
+
+
+def encode_state(state):
+    # Everything step() reads, including the RNG and the free-cell order that
+    # food sampling depends on. Region and distance caches are rebuilt.
+    winner = (state.winner or "").encode()
+    parts = [
+        STATE_HEAD.pack(
+            state.tick,
+            state.ai_move_counter,
+            DIRECTIONS.index(state.player_direction),
+            state.missing_food,
+            state.game_over,
+            state.player_growth,
+            state.player_score,
+            len(winner),
+        ),
+        winner,
+        pack_ints("i", state.ai_growths),
+        pack_ints("i", state.ai_scores),
+    ]
+    for snake in [state.player_snake] + state.ai_snakes:
+        parts.append(pack_ints("i", snake.cells))
+    parts.append(struct.pack("<I", len(state.foods)))
+    for pos, value, color in state.foods:
+        cell = state.grid.index(pos)
+        parts.append(FOOD.pack(cell, value, FOOD_KINDS.index(color)))
+    parts.append(pack_ints("i", state.free_cells.cells))
+    version, internal, gauss = state.rng.getstate()
+    parts.append(RNG_HEAD.pack(version, gauss is not None, gauss or 0.0))
+    parts.append(pack_ints("I", internal))
+    planner = state.planner
+    if planner:
+        # Cached paths steer the planner AI, so they are part of the state.
+        for target, path in zip(planner.targets, planner.paths):
+            parts.append(pack_ints("i", [target, *path]))
+        parts.append(pack_ints("i", planner.new_food))
+    return b"".join(parts)
+
+
+def decode_state(state, data):
+    # Overwrites state (built with the replay's config) with a snapshot.
+    (
+        state.tick,
+        state.ai_move_counter,
+        direction,
+        state.missing_food,
+        game_over,
+        state.player_growth,
+        state.player_score,
+        winner_length,
+    ) = STATE_HEAD.unpack_from(data, 0)
+    pos = STATE_HEAD.size
+    state.player_direction = DIRECTIONS[direction]
+    state.game_over = bool(game_over)
+    state.winner = data[pos : pos + winner_length].decode() or None
+    pos += winner_length
+    growths, pos = unpack_ints("i", data, pos)
+    scores, pos = unpack_ints("i", data, pos)
+    state.ai_growths = list(growths)
+    state.ai_scores = list(scores)
+
+    grid = OccupancyGrid(state.grid_width, state.grid_height)
+    snakes = [state.player_snake] + state.ai_snakes
+    for owner, snake in enumerate(snakes, PLAYER_ID):
+        cells, pos = unpack_ints("i", data, pos)
+        snake.cells = deque(cells)
+        for cell in cells:
+            grid.add(cell, owner)
+    state.grid = grid
+
+    (count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    state.foods = []
+    state.food_at = {}
+    for _ in range(count):
+        cell, value, kind = FOOD.unpack_from(data, pos)
+        pos += FOOD.size
+        food = (grid.pos(cell), value, FOOD_KINDS[kind])
+        state.foods.append(food)
+        state.food_at[cell] = food
+
+    cells, pos = unpack_ints("i", data, pos)
+    free_cells = FreeCells(0)
+    free_cells.cells.extend(cells)
+    free_cells.where.extend([-1] * (state.grid_width * state.grid_height))
+    for i, cell in enumerate(cells):
+        free_cells.where[cell] = i
+    state.free_cells = free_cells
+
+    version, has_gauss, gauss = RNG_HEAD.unpack_from(data, pos)
+    pos += RNG_HEAD.size
+    internal, pos = unpack_ints("I", data, pos)
+    state.rng.setstate((version, internal, gauss if has_gauss else None))
+    if state.planner:
+        planner = PathPlanner(len(state.ai_snakes))
+        for idx in range(len(state.ai_snakes)):
+            values, pos = unpack_ints("i", data, pos)
+            planner.set_path(idx, values[1:], values[0])
+        new_food, pos = unpack_ints("i", data, pos)
+        planner.new_food.extend(new_food)
+        state.planner = planner
+    state.dirty = set()
+    state._regions = None
+    state._distances = None
+    state._field_changes = []
+    state._search = None
+    return state
+
+
+# --- Replays ---
+
+
+class Replay:
+    def __init__(
+        self,
+        grid_width,
+        grid_height,
+        num_ai,
+        win_score,
+        seed,
+        food_count=FOOD_COUNT,
+        ai_move_delay=AI_MOVE_DELAY,
+        ai_kind="greedy",
+    ):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_ai = num_ai
+        self.win_score = win_score
+        self.seed = seed
+        self.food_count = food_count
+        self.ai_move_delay = ai_move_delay
+        self.ai_kind = ai_kind
+        self.ticks = 0
+        self.digest = 0  # CRC32 of encode_state() after the last tick.
+        self.events = []  # (tick, direction index), in tick order
+        self.fallback_ticks = []  # AI ticks decided by fallback_directions()
+        self.keyframes = []  # (tick, compressed snapshot), in tick order
+
+    def new_state(self):
+        return GameState(
+            self.grid_width,
+            self.grid_height,
+            self.num_ai,
+            self.win_score,
+            seed=self.seed,
+            food_count=self.food_count,
+            ai_move_delay=self.ai_move_delay,
+            ai_kind=self.ai_kind,
+        )
+
+    # --- Playback ---
+
+    def advance(self, state, tick):
+        # Steps state forward to tick, applying the recorded direction changes
+        # and AI fallbacks.
+        events = self.events
+        fallback_ticks = set(self.fallback_ticks)
+        i = bisect_right(events, (state.tick, -1))
+        while state.tick < tick and not state.game_over:
+            if i < len(events) and events[i][0] == state.tick:
+                state.player_direction = DIRECTIONS[events[i][1]]
+                i += 1
+            state.step(ai_fallback=state.tick in fallback_ticks)
+        return state
+
+    def state_at(self, tick):
+        # State after tick ticks, starting from the nearest keyframe.
+        tick = min(tick, self.ticks)
+        state = self.new_state()
+        i = bisect_right([keyframe[0] for keyframe in self.keyframes], tick)
+        if i:
+            decode_state(state, zlib.decompress(self.keyframes[i - 1][1]))
+        return self.advance(state, tick)
+
+    def build_keyframes(self, interval=KEYFRAME_INTERVAL):
+        # Regenerates the keyframes, e.g. for a replay archived without them.
+        state = self.new_state()
+        self.keyframes = []
+        for tick in range(interval, self.ticks, interval):
+            self.advance(state, tick)
+            self.keyframes.append((tick, zlib.compress(encode_state(state))))
+
+    def play(self):
+        # Replays the whole game and checks it ends as recorded.
+        state = self.advance(self.new_state(), self.ticks)
+        digest = zlib.crc32(encode_state(state))
+        if state.tick != self.ticks or digest != self.digest:
+            raise ReplayError("replay diverged from the recorded game")
+        return state
+
+    # --- Serialization ---
+
+    def to_bytes(self):
+        out = bytearray(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                self.grid_width,
+                self.grid_height,
+                self.num_ai,
+                self.win_score,
+                self.seed,
+                self.food_count,
+                self.ai_move_delay,
+                self.ticks,
+                self.digest,
+                list(AI_KINDS).index(self.ai_kind),
+            )
+        )
+        events = bytearray()
+        last = 0
+        for tick, direction in self.events:
+            write_varint(events, (tick - last) << 2 | direction)
+            last = tick
+        out += struct.pack("<I", len(events)) + events
+        fallbacks = bytearray()
+        last = 0
+        for tick in self.fallback_ticks:
+            write_varint(fallbacks, tick - last)
+            last = tick
+        out += struct.pack("<I", len(fallbacks)) + fallbacks
+        out += struct.pack("<I", len(self.keyframes))
+        for tick, snapshot in self.keyframes:
+            out += struct.pack("<II", tick, len(snapshot)) + snapshot
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < 5 or data[:4] != MAGIC:
+            raise ReplayError("not a replay file")
+        header = HEADERS.get(data[4])
+        if header is None:
+            raise ReplayError(f"unsupported replay version {data[4]}")
+        if len(data) < header.size:
+            raise ReplayError("truncated replay")
+        fields = header.unpack_from(data, 0)
+        replay = cls(*fields[2:9])
+        replay.ticks, replay.digest = fields[9:11]
+        if len(fields) > 11:
+            if fields[11] >= len(AI_KINDS):
+                raise ReplayError(f"unknown AI kind {fields[11]}")
+            replay.ai_kind = list(AI_KINDS)[fields[11]]
+        try:
+            pos = header.size
+            (length,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            end = pos + length
+            tick = 0
+            while pos < end:
+                value, pos = read_varint(data, pos)
+                tick += value >> 2
+                replay.events.append((tick, value & 3))
+            if data[4] >= 3:
+                (length,) = struct.unpack_from("<I", data, pos)
+                pos += 4
+                end = pos + length
+                tick = 0
+                while pos < end:
+                    value, pos = read_varint(data, pos)
+                    tick += value
+                    replay.fallback_ticks.append(tick)
+            (count,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            for _ in range(count):
+                tick, length = struct.unpack_from("<II", data, pos)
+                pos += 8
+                replay.keyframes.append((tick, data[pos : pos + length]))
+                pos += length
+        except struct.error:
+            raise ReplayError("truncated replay")
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    # Records a game while it is played: call step() instead of state.step().
+    def __init__(self, state, keyframe_interval=KEYFRAME_INTERVAL):
+        if not 0 <= state.seed < 1 << 64:
+            raise ReplayError("replays need a seed in [0, 2**64)")
+        self.state = state
+        self.keyframe_interval = keyframe_interval
+        self.replay = Replay(
+            state.grid_width,
+            state.grid_height,
+            len(state.ai_snakes),
+            state.win_score,
+            state.seed,
+            state.food_count,
+            state.ai_move_delay,
+            state.ai_kind,
+        )
+        self.direction = state.player_direction
+
+    def step(self, player_direction=None, ai_decision=None, ai_fallback=False):
+        # Arguments as for GameState.step().
+        state = self.state
+        interval = self.keyframe_interval
+        if interval and state.tick and state.tick % interval == 0:
+            # Taken before this tick's input, like state_at() returns it. The
+            # game loop may already have set that input on the state, so the
+            # direction is the one the last tick moved in.
+            pending = state.player_direction
+            state.player_direction = self.direction
+            snapshot = zlib.compress(encode_state(state))
+            state.player_direction = pending
+            self.replay.keyframes.append((state.tick, snapshot))
+        if player_direction is not None:
+            state.set_player_direction(player_direction)
+        if state.player_direction != self.direction:
+            self.direction = state.player_direction
+            direction = DIRECTIONS.index(self.direction)
+            self.replay.events.append((state.tick, direction))
+        game_over = state.step(ai_decision=ai_decision, ai_fallback=ai_fallback)
+        self.replay.ticks = state.tick
+        if game_over:
+            self.finish()
+        return game_over
+
+    def finish(self):
+        # The replay of the game so far, also if it is still running.
+        self.replay.fallback_ticks = list(self.state.fallback_ticks)
+        self.replay.digest = zlib.crc32(encode_state(self.state))
+        return self.replay
+
+
+def check_recordings(games, ai_kind="greedy", interval=25):
+    # Records seeded games with random key presses through the AI worker, as
+    # the game loop does, and checks the replay ends as played and that
+    # seeking to every keyframe gives the state replaying from tick 0 does.
+    # Returns the number of games that failed.
+    from snake_ai_worker import AIWorker, play_inputs
+
+    worker = AIWorker(deadline=None)
+    failed = 0
+    for seed in range(games):
+        state = GameState(20, 15, 3, 25, seed=seed, ai_kind=ai_kind)
+        recorder = ReplayRecorder(state, interval)
+        played = play_inputs(state, seed, worker, recorder)
+        replay = Replay.from_bytes(recorder.finish().to_bytes())
+        try:
+            replay.play()
+        except ReplayError as e:
+            print(f"seed {seed}: {e}")
+            failed += 1
+            continue
+        for tick, _ in replay.keyframes:
+            if encode_state(replay.state_at(tick)) != played[tick - 1]:
+                print(f"seed {seed}: seeking to tick {tick} diverged")
+                failed += 1
+                break
+    worker.close()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and play Snake replays.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="record a headless autopilot game")
+    record.add_argument("path")
+    record.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    record.add_argument("--width", type=int, default=96)
+    record.add_argument("--height", type=int, default=54)
+    record.add_argument("--seed", type=int, default=None)
+    record.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    record.add_argument("--keyframes", type=int, default=KEYFRAME_INTERVAL)
+    play = commands.add_parser("play", help="replay a game and verify it")
+    play.add_argument("path")
+    play.add_argument("--tick", type=int, help="only seek to this tick")
+    keyframes = commands.add_parser("keyframes", help="rebuild or strip keyframes")
+    keyframes.add_argument("path")
+    keyframes.add_argument("--interval", type=int, default=KEYFRAME_INTERVAL)
+    check = commands.add_parser(
+        "check", help="record games like the game loop and check seeking"
+    )
+    check.add_argument("--games", type=int, default=20)
+    check.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    check.add_argument("--keyframes", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.command == "check":
+        failed = check_recordings(args.games, args.ai_kind, args.keyframes)
+        print(f"{args.games} games checked, {failed} failed")
+        if failed:
+            raise SystemExit(1)
+        return
+
+    if args.command == "record":
+        win_score, num_ai = DIFFICULTY_PRESETS[args.difficulty]
+        state = GameState(
+            args.width,
+            args.height,
+            num_ai,
+            win_score,
+            seed=args.seed,
+            ai_kind=args.ai_kind,
+        )
+        recorder = ReplayRecorder(state, args.keyframes)
+        while not recorder.step(player_autopilot(state)):
+            pass
+        replay = recorder.finish()
+        replay.save(args.path)
+        print(
+            f"Recorded {replay.ticks} ticks, {len(replay.events)} direction "
+            f"changes, {len(replay.keyframes)} keyframes: {state.winner}"
+        )
+    elif args.command == "keyframes":
+        replay = Replay.load(args.path)
+        if args.interval:
+            replay.build_keyframes(args.interval)
+        else:
+            replay.keyframes = []
+        replay.save(args.path)
+        print(f"{len(replay.keyframes)} keyframes")
+    else:
+        replay = Replay.load(args.path)
+        if args.tick is None:
+            state = replay.play()
+        else:
+            state = replay.state_at(args.tick)
+        ai_scores = " ".join(str(score) for score in state.ai_scores)
+        print(
+            f"Tick {state.tick}/{replay.ticks}  Player: {state.player_score}  "
+            f"AI: {ai_scores}  Winner: {state.winner}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,761 @@
+import argparse
+import asyncio
+import json
+import random
+import select
+import socket
+import struct
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from snake_engine import (
+    AI_KINDS,
+    BASE_FPS,
+    DIFFICULTY_PRESETS,
+    DIRECTIONS,
+    FPS_INCREMENT,
+    GOLD_FOOD_VALUE,
+    NORMAL_FOOD_VALUE,
+    PLAYER_ID,
+    YELLOW_FOOD_VALUE,
+    GameState,
+    OccupancyGrid,
+    SnakeBody,
+)
+from snake_replay import FOOD_KINDS, pack_ints, unpack_ints
+
+# Authoritative game server. Every room runs a GameState headlessly at the
+# game's own tick rate and many rooms share one asyncio loop. A connection
+# gets the full state once, then one small delta per tick, and only mirrors
+# and draws it (RemoteState). `bench` plays simulated clients over loopback
+# and reports how many rooms a core can serve.
+#
+# Frames are a u32 payload length followed by the payload, whose first byte
+# is the message type (little endian throughout):
+#   client -> server
+#     JOIN     width, height, AI count, win score (u16 each), index in
+#              AI_KINDS (u8), then the room name. The first connection in a
+#              room creates it with this config and plays; later ones watch.
+#     INPUT    index in DIRECTIONS (u8)
+#     RESTART  starts a new game after game over (player only)
+#   server -> client
+#     WELCOME  role (u8): PLAYER or SPECTATOR
+#     STATE    config, tick and game over flag, then u32-counted lists of the
+#              scores, every snake's cells (player first, head first) and the
+#              food cells, one kind byte per food, and the winner
+#     DELTA    tick (u32), flags (u8), removed food, added food and score
+#              counts (u16); a move byte per snake that moved (player, then
+#              AIs on AI ticks): index in DIRECTIONS or STAYED, | TAIL_POPPED
+#              if the tail moved too; removed food cells (u32), added food cells
+#              (u32) and their kinds (u8); (snake, score) pairs (u16, u32)
+#              for the snakes that scored, 0 being the player; the winner
+#              once the game is over
+# Scores are sent rather than worked out from the eaten food: AI snakes can
+# share a cell, and a food spawned during a tick can be eaten in the same tick.
+
+HOST = "127.0.0.1"
+PORT = 7777
+MAX_FRAME = 1 << 24  # Largest payload either side accepts.
+MAX_CELLS = 1 << 20  # Largest board a JOIN may ask for; a room takes ~30 MB.
+MAX_AI = 1000
+MAX_BUFFER = 1 << 20  # Bytes queued for a client before it is dropped.
+MAX_LAG = 0.25  # Seconds a room may fall behind before it skips ahead.
+RECV_SIZE = 1 << 16
+TURN_CHANCE = 0.1  # Chance per tick that a simulated player turns.
+
+MSG_JOIN = 1
+MSG_INPUT = 2
+MSG_RESTART = 3
+MSG_WELCOME = 16
+MSG_STATE = 17
+MSG_DELTA = 18
+
+PLAYER = 0
+SPECTATOR = 1
+
+PLAYER_MOVED = 1  # Delta flags.
+AI_MOVED = 2
+GAME_OVER = 4
+STAYED = 4  # Move of an AI with no safe move, which pushes its head again.
+TAIL_POPPED = 8  # Move byte flag.
+
+FRAME = struct.Struct("<I")
+JOIN = struct.Struct("<BHHHHB")
+WELCOME = struct.Struct("<BB")
+STATE_HEAD = struct.Struct("<BHHHHIB")
+DELTA_HEAD = struct.Struct("<BIBHHH")
+SCORE = struct.Struct("<HI")
+
+FOOD_VALUES = {
+    "red": NORMAL_FOOD_VALUE,
+    "yellow": YELLOW_FOOD_VALUE,
+    "gold": GOLD_FOOD_VALUE,
+}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# --- Messages ---
+
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if not 0 < length <= MAX_FRAME:
+        raise ProtocolError(f"bad frame length {length}")
+    return await reader.readexactly(length)
+
+
+def encode_join(room, width, height, num_ai, win_score, ai_kind="greedy"):
+    kind = list(AI_KINDS).index(ai_kind)
+    return JOIN.pack(MSG_JOIN, width, height, num_ai, win_score, kind) + room.encode()
+
+
+def decode_join(payload):
+    # Returns (room name, (width, height, num_ai, win_score, ai_kind)).
+    if len(payload) < JOIN.size:
+        raise ProtocolError("truncated JOIN")
+    _, width, height, num_ai, win_score, kind = JOIN.unpack_from(payload)
+    kinds = list(AI_KINDS)
+    if kind >= len(kinds):
+        raise ProtocolError(f"unknown AI kind {kind}")
+    if width < 4 or height < 4 or width * height > MAX_CELLS:
+        raise ProtocolError(f"bad grid {width}x{height}")
+    if num_ai > MAX_AI or win_score < 1:
+        raise ProtocolError(f"bad config {num_ai} AI, win score {win_score}")
+    if num_ai + 1 > width * height:
+        # GameState would refuse to place the snakes.
+        raise ProtocolError(f"{num_ai} AI snakes do not fit a {width}x{height} grid")
+    try:
+        room = payload[JOIN.size :].decode()
+    except UnicodeDecodeError:
+        raise ProtocolError("bad room name")
+    return room, (width, height, num_ai, win_score, kinds[kind])
+
+
+def encode_full(state):
+    cells = list(state.food_at)
+    parts = [
+        STATE_HEAD.pack(
+            MSG_STATE,
+            state.grid_width,
+            state.grid_height,
+            len(state.ai_snakes),
+            state.win_score,
+            state.tick,
+            state.game_over,
+        ),
+        pack_ints("I", [state.player_score] + state.ai_scores),
+    ]
+    for snake in [state.player_snake] + state.ai_snakes:
+        parts.append(pack_ints("I", snake.cells))
+    parts.append(pack_ints("I", cells))
+    parts.append(bytes(FOOD_KINDS.index(state.food_at[cell][2]) for cell in cells))
+    parts.append((state.winner or "").encode())
+    return b"".join(parts)
+
+
+def move_index(grid, old, new):
+    # Index in DIRECTIONS of the step from cell old to its neighbor new.
+    if new == old:
+        return STAYED
+    for idx, table in enumerate(grid.adjacent):
+        if table[old] == new:
+            return idx
+    raise ValueError(f"cell {new} is not next to {old}")
+
+
+class RemoteState:
+    # Client mirror of a room, built from a STATE and kept current by DELTAs.
+    # It has the fields snake_render.Renderer draws from.
+    def __init__(self, payload):
+        (
+            _,
+            self.grid_width,
+            self.grid_height,
+            num_ai,
+            self.win_score,
+            self.tick,
+            game_over,
+        ) = STATE_HEAD.unpack_from(payload)
+        pos = STATE_HEAD.size
+        self.grid_size = (self.grid_width, self.grid_height)
+        scores, pos = unpack_ints("I", payload, pos)
+        self.player_score = scores[0]
+        self.ai_scores = list(scores[1:])
+
+        self.grid = OccupancyGrid(self.grid_width, self.grid_height)
+        snakes = []
+        for owner in range(PLAYER_ID, num_ai + 2):
+            cells, pos = unpack_ints("I", payload, pos)
+            snake = SnakeBody([], self.grid_width)
+            snake.cells.extend(cells)
+            for cell in cells:
+                self.grid.add(cell, owner)
+            snakes.append(snake)
+        self.player_snake = snakes[0]
+        self.ai_snakes = snakes[1:]
+
+        self.dirty = set()
+        self.foods = []
+        self.food_at = {}
+        cells, pos = unpack_ints("I", payload, pos)
+        for cell, kind in zip(cells, payload[pos : pos + len(cells)]):
+            self.add_food(cell, kind)
+        pos += len(cells)
+        self.game_over = bool(game_over)
+        self.winner = payload[pos:].decode() or None
+
+    @property
+    def current_fps(self):
+        total_food = self.player_score + sum(self.ai_scores)
+        return BASE_FPS + ((total_food // 5) * FPS_INCREMENT)
+
+    def add_food(self, cell, kind):
+        color = FOOD_KINDS[kind]
+        food = (self.grid.pos(cell), FOOD_VALUES[color], color)
+        self.foods.append(food)
+        self.food_at[cell] = food
+        self.dirty.add(cell)
+
+    def apply_delta(self, payload):
+        # Moves the snakes in the order GameState.step() does, so the grid
+        # ends up the same as the server's.
+        _, tick, flags, removed, added, scored = DELTA_HEAD.unpack_from(payload)
+        pos = DELTA_HEAD.size
+        grid = self.grid
+        dirty = self.dirty
+        if flags & PLAYER_MOVED:
+            snakes = [(PLAYER_ID, self.player_snake)]
+            if flags & AI_MOVED:
+                snakes += [(idx + 2, snake) for idx, snake in enumerate(self.ai_snakes)]
+            for (owner, snake), move in zip(snakes, payload[pos : pos + len(snakes)]):
+                head = snake.head
+                if move & 7 != STAYED:
+                    head = grid.adjacent[move & 7][head]
+                dirty.add(snake.head)
+                dirty.add(head)
+                snake.push_head(head)
+                grid.add(head, owner)
+                if move & TAIL_POPPED:
+                    tail = snake.pop_tail()
+                    dirty.add(tail)
+                    grid.remove(tail)
+            pos += len(snakes)
+
+        for cell in struct.unpack_from(f"<{removed}I", payload, pos):
+            food = self.food_at.pop(cell)
+            self.foods.remove(food)
+            dirty.add(cell)
+        pos += 4 * removed
+        cells = struct.unpack_from(f"<{added}I", payload, pos)
+        pos += 4 * added
+        for cell, kind in zip(cells, payload[pos : pos + added]):
+            self.add_food(cell, kind)
+        pos += added
+        for _ in range(scored):
+            idx, score = SCORE.unpack_from(payload, pos)
+            pos += SCORE.size
+            if idx == 0:
+                self.player_score = score
+            else:
+                self.ai_scores[idx - 1] = score
+
+        self.tick = tick
+        if flags & GAME_OVER:
+            self.game_over = True
+            self.winner = payload[pos:].decode() or None
+
+
+# --- Rooms ---
+
+
+class Room:
+    # One match and the connections in it. The first connection to join
+    # steers the player snake; the rest watch. Closes with its last client.
+    def __init__(self, server, name, config):
+        self.server = server
+        self.name = name
+        self.config = config  # (width, height, num_ai, win_score, ai_kind)
+        self.clients = []
+        self.player = None
+        self.restarted = asyncio.Event()
+        self.new_game()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        self.task.add_done_callback(self.finished)
+
+    def new_game(self):
+        width, height, num_ai, win_score, ai_kind = self.config
+        state = GameState(
+            width,
+            height,
+            num_ai,
+            win_score,
+            seed=self.server.new_seed(),
+            ai_kind=ai_kind,
+        )
+        state.dirty.clear()
+        self.state = state
+        self.known_food = dict(state.food_at)  # Food the clients know about.
+        self.broadcast(frame(encode_full(state)))
+
+    def join(self, writer):
+        role = SPECTATOR
+        if self.player is None:
+            self.player = writer
+            role = PLAYER
+        self.clients.append(writer)
+        self.send(writer, frame(WELCOME.pack(MSG_WELCOME, role)))
+        self.send(writer, frame(encode_full(self.state)))
+
+    def leave(self, writer):
+        self.clients.remove(writer)
+        if writer is self.player:
+            self.player = None
+        if not self.clients:
+            self.task.cancel()
+            if self.server.rooms.get(self.name) is self:
+                del self.server.rooms[self.name]
+
+    def finished(self, task):
+        # A room whose task fails stops ticking: report the error and close
+        # its clients rather than leave them waiting on a frozen game.
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        print(f"Room {self.name!r} failed:", file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__)
+        if self.server.rooms.get(self.name) is self:
+            del self.server.rooms[self.name]
+        for writer in list(self.clients):
+            writer.close()
+
+    def input(self, writer, direction):
+        if writer is self.player and direction < len(DIRECTIONS):
+            self.state.set_player_direction(DIRECTIONS[direction])
+
+    def restart(self, writer):
+        if writer is self.player and self.state.game_over:
+            self.new_game()
+            self.restarted.set()
+
+    def send(self, writer, data):
+        # Queues data without waiting; a client too slow to drain its queue
+        # is dropped rather than holding up the room.
+        if writer.transport.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            writer.close()
+            return
+        writer.write(data)
+        self.server.bytes_sent += len(data)
+
+    def broadcast(self, data):
+        for writer in list(self.clients):
+            self.send(writer, data)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        server = self.server
+        next_tick = loop.time()
+        while True:
+            if self.state.game_over:
+                self.restarted.clear()
+                await self.restarted.wait()
+                next_tick = loop.time()
+            step_time = 1 / self.state.current_fps
+            next_tick += step_time
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -step_time:
+                server.late += 1
+                if delay < -MAX_LAG:
+                    next_tick = loop.time()  # Skip ahead instead of bursting.
+            start = time.perf_counter()
+            self.broadcast(frame(self.tick()))
+            server.busy += time.perf_counter() - start
+            server.ticks += 1
+
+    def tick(self):
+        # Steps the game and returns the DELTA payload for the tick.
+        state = self.state
+        ai_tick = state.is_ai_tick() and bool(state.ai_snakes)
+        snakes = [state.player_snake]
+        if ai_tick:
+            snakes += state.ai_snakes
+        before = [(snake.head, len(snake)) for snake in snakes]
+        scores = [state.player_score] + (state.ai_scores if ai_tick else [])
+        state.step()
+        grid = state.grid
+
+        flags = 0
+        moves = bytearray()
+        scored = []
+        if state.player_snake.head != before[0][0]:
+            flags |= PLAYER_MOVED | (AI_MOVED if ai_tick else 0)
+            for snake, (head, length) in zip(snakes, before):
+                move = move_index(grid, head, snake.head)
+                if len(snake) == length:
+                    move |= TAIL_POPPED
+                moves.append(move)
+            now = [state.player_score] + state.ai_scores
+            for idx, score in enumerate(scores):
+                if now[idx] != score:
+                    scored.append(SCORE.pack(idx, now[idx]))
+
+        # Food only changes on cells step() marks dirty.
+        removed = []
+        added = []
+        known = self.known_food
+        for cell in state.dirty:
+            food = state.food_at.get(cell)
+            if known.get(cell) is not food:
+                if cell in known:
+                    removed.append(cell)
+                    del known[cell]
+                if food is not None:
+                    added.append(cell)
+                    known[cell] = food
+        state.dirty.clear()
+
+        winner = b""
+        if state.game_over:
+            flags |= GAME_OVER
+            winner = (state.winner or "").encode()
+        return b"".join(
+            [
+                DELTA_HEAD.pack(
+                    MSG_DELTA,
+                    state.tick,
+                    flags,
+                    len(removed),
+                    len(added),
+                    len(scored),
+                ),
+                moves,
+                struct.pack(f"<{len(removed)}I", *removed),
+                struct.pack(f"<{len(added)}I", *added),
+                bytes(FOOD_KINDS.index(known[cell][2]) for cell in added),
+                *scored,
+                winner,
+            ]
+        )
+
+
+class GameServer:
+    def __init__(self, seed=None):
+        self.rooms = {}  # name -> Room
+        self.seeds = random.Random(seed) if seed is not None else None
+        self.server = None
+        self.writers = set()
+        # Totals over every room, for measuring load:
+        self.ticks = 0
+        self.busy = 0.0  # Seconds spent stepping, encoding and sending.
+        self.late = 0  # Ticks that started more than a tick behind schedule.
+        self.bytes_sent = 0
+
+    def new_seed(self):
+        return self.seeds.getrandbits(64) if self.seeds else None
+
+    async def start(self, host=HOST, port=PORT):
+        # Returns the port listened on (pass port 0 for any free one).
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    def close(self):
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+
+    async def handle(self, reader, writer):
+        self.writers.add(writer)
+        room = None
+        try:
+            while True:
+                payload = await read_frame(reader)
+                kind = payload[0]
+                if room is None:
+                    if kind != MSG_JOIN:
+                        raise ProtocolError(f"expected JOIN, got {kind}")
+                    name, config = decode_join(payload)
+                    room = self.rooms.get(name)
+                    if room is None:
+                        room = self.rooms[name] = Room(self, name, config)
+                    room.join(writer)
+                elif kind == MSG_INPUT and len(payload) == 2:
+                    room.input(writer, payload[1])
+                elif kind == MSG_RESTART:
+                    room.restart(writer)
+                else:
+                    raise ProtocolError(f"unexpected message {kind}")
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            if room is not None:
+                room.leave(writer)
+            writer.close()
+
+
+# --- Clients ---
+
+
+class Connection:
+    # Client end of a server connection for a loop that cannot await, such
+    # as the pygame client: send() writes a payload as one frame and poll()
+    # returns the payloads that have fully arrived, without blocking.
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+
+    def send(self, payload):
+        self.sock.sendall(frame(payload))
+
+    def poll(self):
+        while select.select([self.sock], [], [], 0)[0]:
+            data = self.sock.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.buffer += data
+        payloads = []
+        buffer = self.buffer
+        while len(buffer) >= FRAME.size:
+            (length,) = FRAME.unpack_from(buffer)
+            if not 0 < length <= MAX_FRAME:
+                raise ProtocolError(f"bad frame length {length}")
+            if len(buffer) < FRAME.size + length:
+                break
+            payloads.append(bytes(buffer[FRAME.size : FRAME.size + length]))
+            del buffer[: FRAME.size + length]
+        return payloads
+
+    def close(self):
+        self.sock.close()
+
+
+class SimClient:
+    # A simulated player over a real connection. It mirrors its room, keeps
+    # going straight into free cells with an occasional random turn, and
+    # restarts every finished game. Spectators only mirror.
+    def __init__(self, room, config, seed=None):
+        self.room = room
+        self.config = config  # (width, height, num_ai, win_score, ai_kind)
+        self.rng = random.Random(seed)
+        self.direction = (1, 0)
+        self.reader = self.writer = None
+        self.role = None
+        self.deltas = 0
+        self.states = 0
+        self.bytes = 0
+
+    def steer(self, state):
+        grid = state.grid
+        head = state.player_snake.head
+        ahead = grid.neighbor(head, self.direction)
+        if grid.counts[ahead] == 0 and self.rng.random() >= TURN_CHANCE:
+            return self.direction
+        reverse = (-self.direction[0], -self.direction[1])
+        options = [
+            move
+            for move in DIRECTIONS
+            if move != reverse and grid.counts[grid.neighbor(head, move)] == 0
+        ]
+        return self.rng.choice(options) if options else self.direction
+
+    async def connect(self, host, port):
+        # Joins the room; returns once the server has said which role this is.
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(frame(encode_join(self.room, *self.config)))
+        payload = await read_frame(self.reader)
+        if payload[0] != MSG_WELCOME:
+            raise ProtocolError(f"expected WELCOME, got {payload[0]}")
+        self.role = payload[1]
+
+    async def run(self):
+        # Plays until the server closes the connection.
+        reader = self.reader
+        writer = self.writer
+        state = None
+        try:
+            while True:
+                payload = await read_frame(reader)
+                self.bytes += FRAME.size + len(payload)
+                kind = payload[0]
+                if kind == MSG_STATE:
+                    state = RemoteState(payload)
+                    self.direction = (1, 0)
+                    self.states += 1
+                elif kind == MSG_DELTA:
+                    state.apply_delta(payload)
+                    self.deltas += 1
+                if self.role != PLAYER:
+                    continue
+                if kind == MSG_DELTA and state.game_over:
+                    writer.write(frame(bytes([MSG_RESTART])))
+                elif not state.game_over:
+                    direction = self.steer(state)
+                    if direction != self.direction:
+                        self.direction = direction
+                        index = DIRECTIONS.index(direction)
+                        writer.write(frame(bytes([MSG_INPUT, index])))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def simulate_clients(host, port, rooms, spectators, config, seed=0):
+    # Runs a player and spectators in each of rooms rooms until the server
+    # hangs up; returns the totals the clients received.
+    async def play():
+        players = [
+            SimClient(f"bench-{idx}", config, seed + idx) for idx in range(rooms)
+        ]
+        watchers = [
+            SimClient(f"bench-{idx}", config)
+            for idx in range(rooms)
+            for _ in range(spectators)
+        ]
+        # Players first, so each one creates its room.
+        await asyncio.gather(*[client.connect(host, port) for client in players])
+        await asyncio.gather(*[client.connect(host, port) for client in watchers])
+        clients = players + watchers
+        await asyncio.gather(*[client.run() for client in clients])
+        return {
+            "deltas": sum(client.deltas for client in clients),
+            "states": sum(client.states for client in clients),
+            "bytes": sum(client.bytes for client in clients),
+        }
+
+    return asyncio.run(play())
+
+
+async def bench(rooms, seconds, spectators, config, seed=0):
+    # Serves rooms rooms to simulated clients in another process and
+    # measures this process's CPU time over seconds of play once they are
+    # all open.
+    server = GameServer(seed)
+    port = await server.start(HOST, 0)
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        clients = loop.run_in_executor(
+            pool, simulate_clients, HOST, port, rooms, spectators, config, seed
+        )
+        while len(server.rooms) < rooms:
+            if clients.done():
+                clients.result()  # Raises what went wrong.
+                raise RuntimeError("clients stopped before all rooms opened")
+            await asyncio.sleep(0.05)
+        start = (time.perf_counter(), time.process_time())
+        totals = (server.ticks, server.busy, server.late, server.bytes_sent)
+        await asyncio.sleep(seconds)
+        wall = time.perf_counter() - start[0]
+        cpu = time.process_time() - start[1]
+        ticks, busy, late, sent = (
+            now - then
+            for now, then in zip(
+                (server.ticks, server.busy, server.late, server.bytes_sent), totals
+            )
+        )
+        full = sum(len(encode_full(room.state)) for room in server.rooms.values())
+        server.close()
+        received = await clients
+    return {
+        "rooms": rooms,
+        "clients": rooms * (1 + spectators),
+        "seconds": wall,
+        "cpu_seconds": cpu,
+        "ticks": ticks,
+        "tick_seconds": busy,
+        "late_ticks": late,
+        "bytes_sent": sent,
+        "full_state_bytes": full / rooms,
+        "rooms_per_core": rooms * wall / cpu if cpu else 0.0,
+        "received": received,
+    }
+
+
+def print_bench(result):
+    ticks = result["ticks"] or 1
+    wall = result["seconds"]
+    print(
+        f"{result['rooms']} rooms, {result['clients']} clients, {wall:.1f}s: "
+        f"{result['ticks'] / wall:.0f} ticks/s "
+        f"({result['ticks'] / wall / result['rooms']:.1f} per room), "
+        f"{result['late_ticks']} late"
+    )
+    print(
+        f"Server CPU {result['cpu_seconds']:.2f}s "
+        f"({100 * result['cpu_seconds'] / wall:.0f}% of a core), "
+        f"{1e6 * result['tick_seconds'] / ticks:.0f} us per room tick"
+    )
+    print(
+        f"Sent {result['bytes_sent'] / wall / 1024:.1f} KiB/s, "
+        f"{result['bytes_sent'] / ticks:.0f} B per room tick "
+        f"(full state {result['full_state_bytes']:.0f} B)"
+    )
+    print(f"Rooms per core: {result['rooms_per_core']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snake game server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="host rooms until interrupted")
+    serve.add_argument("--host", default=HOST)
+    serve.add_argument("--port", type=int, default=PORT)
+    serve.add_argument("--seed", type=int, default=None)
+    load = commands.add_parser(
+        "bench", help="serve simulated clients over loopback and measure load"
+    )
+    load.add_argument("--rooms", type=int, default=100)
+    load.add_argument("--seconds", type=float, default=10.0)
+    load.add_argument("--spectators", type=int, default=0, help="per room")
+    load.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    load.add_argument("--ai", type=int, help="AI snakes (overrides --difficulty)")
+    load.add_argument("--win-score", type=int)
+    load.add_argument("--width", type=int, default=96)
+    load.add_argument("--height", type=int, default=54)
+    load.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+
+        async def serve_forever():
+            server = GameServer(args.seed)
+            port = await server.start(args.host, args.port)
+            print(f"Serving on {args.host}:{port}")
+            await server.server.serve_forever()
+
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+    else:
+        win_score, num_ai = DIFFICULTY_PRESETS[args.difficulty]
+        if args.ai is not None:
+            num_ai = args.ai
+        if args.win_score is not None:
+            win_score = args.win_score
+        config = (args.width, args.height, num_ai, win_score, args.ai_kind)
+        result = asyncio.run(
+            bench(args.rooms, args.seconds, args.spectators, config, args.seed)
+        )
+        print_bench(result)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from snake_engine import AI_KINDS, DIFFICULTY_PRESETS, GameState, run_headless
+
+# Headless tournaments over the start menu presets and custom configs, with
+# seeded games spread over a process pool. Game n of a config always uses
+# seed --seed + n, so results do not depend on the number of workers.
+
+PRESET_NAMES = {1: "easy", 2: "medium", 3: "hard"}
+
+
+def preset_configs(width, height):
+    # (name, width, height, num_ai, win_score) for the start_menu presets.
+    configs = []
+    for difficulty, (win_score, num_ai) in sorted(DIFFICULTY_PRESETS.items()):
+        configs.append((PRESET_NAMES[difficulty], width, height, num_ai, win_score))
+    return configs
+
+
+def parse_config(text):
+    # "WIDTHxHEIGHT:AI:WIN", e.g. "60x40:2:20".
+    try:
+        size, num_ai, win_score = text.split(":")
+        width, height = size.lower().split("x")
+        config = (text, int(width), int(height), int(num_ai), int(win_score))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected WIDTHxHEIGHT:AI:WIN, got {text!r}"
+        )
+    if config[1] < 1 or config[2] < 1 or config[3] < 1 or config[4] < 1:
+        raise argparse.ArgumentTypeError(f"invalid config {text!r}")
+    return config
+
+
+def play_games(config, seeds, max_ticks, ai_kind="greedy"):
+    # Runs in a worker process. Returns one result dict per seed.
+    name, width, height, num_ai, win_score = config
+    results = []
+    for seed in seeds:
+        state = GameState(width, height, num_ai, win_score, seed=seed, ai_kind=ai_kind)
+        ticks, _ = run_headless(state, max_ticks=max_ticks)
+        results.append(
+            {
+                "config": name,
+                "seed": seed,
+                "winner": state.winner,
+                "ticks": ticks,
+                "player_score": state.player_score,
+                "ai_scores": list(state.ai_scores),
+            }
+        )
+    return results
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a sorted list.
+    if not values:
+        return 0
+    rank = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[rank]
+
+
+class ConfigStats:
+    def __init__(self, config):
+        self.config = config
+        self.games = 0
+        self.winners = {}
+        self.ticks = []
+        self.player_scores = {}
+        self.ai_scores = {}
+
+    def add(self, result):
+        self.games += 1
+        winner = result["winner"] or "Unfinished"
+        self.winners[winner] = self.winners.get(winner, 0) + 1
+        self.ticks.append(result["ticks"])
+        score = result["player_score"]
+        self.player_scores[score] = self.player_scores.get(score, 0) + 1
+        for score in result["ai_scores"]:
+            self.ai_scores[score] = self.ai_scores.get(score, 0) + 1
+
+    def summary(self):
+        ticks = sorted(self.ticks)
+        games = self.games or 1
+        return {
+            "config": self.config[0],
+            "grid": [self.config[1], self.config[2]],
+            "num_ai": self.config[3],
+            "win_score": self.config[4],
+            "games": self.games,
+            "win_rates": {
+                winner: count / games
+                for winner, count in sorted(self.winners.items(), key=lambda kv: -kv[1])
+            },
+            "tie_rate": self.winners.get("It is a Tie", 0) / games,
+            "ticks": {
+                "mean": sum(ticks) / games,
+                "min": ticks[0] if ticks else 0,
+                "p50": percentile(ticks, 0.5),
+                "p95": percentile(ticks, 0.95),
+                "max": ticks[-1] if ticks else 0,
+            },
+            "player_scores": dict(sorted(self.player_scores.items())),
+            "ai_scores": dict(sorted(self.ai_scores.items())),
+        }
+
+
+def format_distribution(counts):
+    return "  ".join(f"{score}:{count}" for score, count in counts.items())
+
+
+def print_summary(summary):
+    width, height = summary["grid"]
+    print(
+        f"== {summary['config']} ({width}x{height}, {summary['num_ai']} AI, "
+        f"win score {summary['win_score']}): {summary['games']} games"
+    )
+    for winner, rate in summary["win_rates"].items():
+        print(f"  {winner}: {rate:.1%}")
+    ticks = summary["ticks"]
+    print(
+        f"  Ticks: mean {ticks['mean']:.0f}  min {ticks['min']}  "
+        f"p50 {ticks['p50']}  p95 {ticks['p95']}  max {ticks['max']}"
+    )
+    print(f"  Player scores: {format_distribution(summary['player_scores'])}")
+    print(f"  AI scores: {format_distribution(summary['ai_scores'])}")
+
+
+def run_tournament(
+    configs,
+    games,
+    seed=0,
+    max_ticks=100000,
+    workers=None,
+    chunk=4,
+    progress=None,
+    ai_kind="greedy",
+):
+    # Plays `games` seeded games of every config on a process pool and returns
+    # one ConfigStats per config. Results are aggregated as chunks finish;
+    # progress(done, total) is called after each one.
+    stats = [ConfigStats(config) for config in configs]
+    total = games * len(configs)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for index, config in enumerate(configs):
+            for first in range(0, games, chunk):
+                seeds = range(seed + first, seed + min(games, first + chunk))
+                future = pool.submit(
+                    play_games, config, list(seeds), max_ticks, ai_kind
+                )
+                futures[future] = index
+        for future in as_completed(futures):
+            results = future.result()
+            for result in results:
+                stats[futures[future]].add(result)
+            done += len(results)
+            if progress:
+                progress(done, total)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Snake tournaments.")
+    parser.add_argument("--games", type=int, default=100, help="games per config")
+    parser.add_argument(
+        "--difficulty",
+        type=int,
+        choices=[1, 2, 3],
+        action="append",
+        help="preset to play (repeatable); all three when no config is given",
+    )
+    parser.add_argument(
+        "--config",
+        type=parse_config,
+        action="append",
+        default=[],
+        help="custom config WIDTHxHEIGHT:AI:WIN (repeatable)",
+    )
+    parser.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=4, help="games per task")
+    parser.add_argument("--json", help="also write the summaries to this file")
+    args = parser.parse_args()
+
+    presets = preset_configs(args.width, args.height)
+    if args.difficulty:
+        configs = [presets[difficulty - 1] for difficulty in args.difficulty]
+    elif args.config:
+        configs = []
+    else:
+        configs = presets
+    configs += args.config
+
+    def progress(done, total):
+        print(f"\r{done}/{total} games", end="", flush=True)
+
+    start = time.perf_counter()
+    stats = run_tournament(
+        configs,
+        args.games,
+        args.seed,
+        args.max_ticks,
+        args.workers,
+        max(1, args.chunk),
+        progress,
+        args.ai_kind,
+    )
+    elapsed = time.perf_counter() - start
+    total_ticks = sum(sum(config.ticks) for config in stats)
+    print(
+        f"\r{args.games * len(configs)} games on {args.workers} workers in "
+        f"{elapsed:.1f}s ({total_ticks / elapsed if elapsed else 0:.0f} ticks/s)"
+    )
+    summaries = [config.summary() for config in stats]
+    for summary in summaries:
+        print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# pygame greets on stdout when imported, which would corrupt --video -.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame  # noqa: E402
+
+from snake_engine import (  # noqa: E402
+    AI_KINDS,
+    DIFFICULTY_PRESETS,
+    GameState,
+    player_autopilot,
+)
+from snake_render import Renderer, TextCache  # noqa: E402
+from snake_replay import Replay, ReplayRecorder  # noqa: E402
+
+# Renders replays and headless matches offscreen, with no window, as fast as
+# the engine and the drawing go. The game's Renderer draws into a
+# pygame.Surface. Only the cells that changed since the last frame are
+# repainted, so skipped ticks cost no drawing. Frames are saved as PNGs or
+# written as raw video to an encoder's stdin (ffmpeg by default) straight from
+# the surface's pixel buffer. --scale draws a downscaled copy into a second
+# surface allocated once per clip.
+
+ENCODER = "ffmpeg"
+FPS = 30  # Frame rate of the encoded video.
+
+
+class VideoError(Exception):
+    pass
+
+
+def pixel_format(surface):
+    # ffmpeg -pix_fmt name for the byte order of a 32-bit surface, e.g. bgr0.
+    if surface.get_bytesize() != 4:
+        raise VideoError("raw video needs a 32-bit surface")
+    channels = ["0"] * 4
+    for name, shift, mask in zip("rgba", surface.get_shifts(), surface.get_masks()):
+        if mask:
+            channels[shift // 8] = name
+    if sys.byteorder == "big":
+        channels.reverse()
+    return "".join(channels)
+
+
+class PngWriter:
+    # One numbered PNG per frame in directory.
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.frames = 0
+
+    def write(self, surface):
+        path = os.path.join(self.directory, f"frame{self.frames:06d}.png")
+        pygame.image.save(surface, path)
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class RawVideoWriter:
+    # Raw frames to the encoder, which is started on the first frame with its
+    # size and pixel format and encodes them into path, or to stdout for path
+    # "-". The pipe is written from the surface's own buffer.
+    def __init__(self, path, fps=FPS, encoder=ENCODER):
+        self.path = path
+        self.fps = fps
+        self.encoder = encoder
+        self.process = None
+        self.out = None
+        self.frames = 0
+
+    def start(self, surface):
+        width, height = surface.get_size()
+        if self.path == "-":
+            print(
+                f"raw video {width}x{height} {pixel_format(surface)}", file=sys.stderr
+            )
+            self.out = sys.stdout.buffer
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        command = [
+            self.encoder,
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            pixel_format(surface),
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(self.fps),
+            "-i",
+            "-",
+            # Most players need yuv420p, which needs an even frame size.
+            "-vf",
+            "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-pix_fmt",
+            "yuv420p",
+            self.path,
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.out = self.process.stdin
+
+    def write(self, surface):
+        if self.out is None:
+            self.start(surface)
+        self.out.write(surface.get_view("0"))
+        self.frames += 1
+
+    def close(self):
+        if self.process is None:
+            if self.out is not None:
+                self.out.flush()
+            return
+        self.out.close()
+        if self.process.wait():
+            raise VideoError(f"encoder exited with code {self.process.returncode}")
+
+
+def record_match(seed, width, height, num_ai, win_score, ai_kind):
+    # Plays a headless autopilot game into an in-memory replay, whose
+    # keyframes let --last start near the end.
+    state = GameState(width, height, num_ai, win_score, seed=seed, ai_kind=ai_kind)
+    recorder = ReplayRecorder(state)
+    while not recorder.step(player_autopilot(state)):
+        pass
+    return recorder.finish()
+
+
+def render_replay(replay, writer, cell_size, scale=1.0, every=1, last=None):
+    # Draws every every-th tick of replay (the last ones only with last)
+    # into writer. Returns the number of frames.
+    size = (replay.grid_width * cell_size, replay.grid_height * cell_size)
+    board = pygame.Surface(size, 0, 32)
+    frame = board
+    if scale != 1.0:
+        scaled = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+        frame = pygame.Surface(scaled, 0, board)
+    renderer = Renderer(board, TextCache(), cell_size, offscreen=True)
+    start = 0 if last is None else max(0, replay.ticks - last)
+    state = replay.state_at(start)
+    frames = 0
+    while True:
+        renderer.draw(state, replay.win_score)
+        if frame is not board:
+            pygame.transform.smoothscale(board, frame.get_size(), frame)
+        writer.write(frame)
+        frames += 1
+        if state.game_over or state.tick >= replay.ticks:
+            return frames
+        replay.advance(state, min(state.tick + every, replay.ticks))
+
+
+def render_job(job, options):
+    # Renders one game in a worker: job is a replay path or a match seed.
+    pygame.font.init()
+    if isinstance(job, str):
+        replay = Replay.load(job)
+        name = os.path.splitext(os.path.basename(job))[0]
+    else:
+        replay = record_match(
+            job,
+            options.width,
+            options.height,
+            options.num_ai,
+            options.win_score,
+            options.ai_kind,
+        )
+        name = f"seed{job}"
+    start = time.perf_counter()
+    if options.png:
+        writer = PngWriter(options.png.format(name=name))
+    else:
+        writer = RawVideoWriter(
+            options.video.format(name=name), options.fps, options.encoder
+        )
+    try:
+        frames = render_replay(
+            replay,
+            writer,
+            options.cell_size,
+            options.scale,
+            options.every,
+            options.last,
+        )
+    finally:
+        writer.close()
+    return name, replay.ticks, frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render Snake replays or headless matches offscreen."
+    )
+    parser.add_argument("replays", nargs="*", help=".snkr files to render")
+    parser.add_argument(
+        "--games", type=int, default=0, help="also render this many autopilot matches"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match")
+    parser.add_argument("--difficulty", type=int, choices=[1, 2, 3], default=3)
+    parser.add_argument("--ai-kind", choices=list(AI_KINDS), default="greedy")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        "--png", metavar="DIR", help="write numbered PNGs to DIR, e.g. frames/{name}"
+    )
+    output.add_argument(
+        "--video",
+        metavar="FILE",
+        help="encode to FILE, e.g. clips/{name}.mp4, or - for raw frames on stdout",
+    )
+    parser.add_argument("--encoder", default=ENCODER, help="ffmpeg executable")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--cell-size", type=int, default=8, help="pixels")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="downscale frames by this factor"
+    )
+    parser.add_argument("--every", type=int, default=1, help="draw every Nth tick")
+    parser.add_argument(
+        "--last", type=int, metavar="TICKS", help="only render each game's final ticks"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    jobs = list(args.replays) + list(range(args.seed, args.seed + args.games))
+    if not jobs:
+        parser.error("give replay files or --games")
+    if args.video == "-" and len(jobs) > 1:
+        parser.error("only one game can be written to stdout")
+    if len(jobs) > 1 and "{name}" not in (args.png or args.video):
+        parser.error("rendering several games needs {name} in the output path")
+    args.win_score, args.num_ai = DIFFICULTY_PRESETS[args.difficulty]
+    log = sys.stderr if args.video == "-" else sys.stdout
+
+    start = time.perf_counter()
+    total_frames = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(render_job, job, args) for job in jobs]
+        for future in futures:
+            name, ticks, frames, seconds = future.result()
+            total_frames += frames
+            print(
+                f"{name}: {ticks} ticks, {frames} frames in {seconds:.2f}s",
+                file=log,
+            )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(jobs)} games, {total_frames} frames in {elapsed:.2f}s "
+        f"({total_frames / elapsed if elapsed else 0:.0f} frames per second)",
+        file=log,
+    )
+
+
+if __name__ == "__main__":
+    main()